@@ -0,0 +1,91 @@
+"""
+Regression check for the upload body caps
+
+Sends multipart bodies over the cap to /upload and /transcribe/ in-process,
+both chunked (no Content-Length) and with an under-declared Content-Length,
+and exits non-zero unless every one is answered with a 413. The caps are
+enforced while the body streams in, so none of these requests reaches
+MongoDB, Groq or the speech service.
+
+    python -m bench.check_limits
+"""
+import os
+import sys
+import asyncio
+
+CHECK_MAX_BYTES = 100_000
+BODY_BYTES = 300_000
+CHUNK_BYTES = 16 * 1024
+BOUNDARY = "check-limits-boundary"
+
+ROUTES = [
+    ("/upload", "resume.pdf", "application/pdf"),
+    ("/transcribe/", "answer.webm", "audio/webm"),
+]
+
+
+def multipart_chunks(filename: str, content_type: str):
+    yield (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    for _ in range(BODY_BYTES // CHUNK_BYTES):
+        yield b"\0" * CHUNK_BYTES
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def oversized_request(app, path: str, filename: str, content_type: str, content_length: str = None) -> int:
+    """Drives one request through the ASGI app; returns the response status"""
+    chunks = list(multipart_chunks(filename, content_type))
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length is not None:
+        headers.append((b"content-length", content_length.encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": headers, "client": ("127.0.0.1", 1), "server": ("check", 80), "state": {}
+    }
+    status = None
+
+    async def receive():
+        if chunks:
+            return {"type": "http.request", "body": chunks.pop(0), "more_body": bool(chunks)}
+        # Nothing more to send; behave like a client waiting for its response
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start" and status is None:
+            status = message["status"]
+
+    await asyncio.wait_for(app(scope, receive, send), 30)
+    return status
+
+
+async def run() -> int:
+    from main import app
+
+    failures = 0
+    for path, filename, content_type in ROUTES:
+        for description, content_length in (("chunked", None), ("under-declared", "1000")):
+            status = await oversized_request(app, path, filename, content_type, content_length)
+            ok = status == 413
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {path} {description} {BODY_BYTES} byte body -> {status}")
+    return 1 if failures else 0
+
+
+def main() -> int:
+    # The app reads these at import time
+    os.environ["RESUME_MAX_BYTES"] = str(CHECK_MAX_BYTES)
+    os.environ["TRANSCRIBE_MAX_BYTES"] = str(CHECK_MAX_BYTES)
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("GROQ_API_KEY", "check")
+    os.environ.setdefault("AZURE_SPEECH_KEY", "check")
+    os.environ.setdefault("SESSION_SECRET", "check")
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
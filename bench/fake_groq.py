@@ -0,0 +1,87 @@
+"""
+OpenAI-compatible stand-in for api.groq.com used by the benchmark harness
+Latency, streaming speed and response size are configurable so runs are
+reproducible without calling the paid API
+"""
+import json
+import time
+import asyncio
+import threading
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from services.evaluation import CATEGORIES
+
+QUESTION = (
+    "Thanks for sharing that. Could you walk me through a project where you had to make a difficult "
+    "technical trade-off, and how you decided what to prioritize?"
+)
+SUMMARY = "The candidate described relevant experience and explained their approach clearly."
+
+
+def _completion_text(payload: dict) -> str:
+    messages = payload.get("messages", [])
+    system_text = " ".join(m["content"] for m in messages if m["role"] == "system")
+    if payload.get("response_format", {}).get("type") == "json_object":
+        return json.dumps({name: {"score": 7, "summary": SUMMARY} for name in CATEGORIES})
+    if "interview evaluator" in system_text:
+        return f"Score: 7\nSummary: {SUMMARY} Their answer was well structured."
+    return QUESTION
+
+
+def create_app(latency: float = 0.5, token_delay: float = 0.01) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        app.state.requests += 1
+        text = _completion_text(payload)
+        usage = {"prompt_tokens": sum(len(m["content"]) for m in payload["messages"]) // 4, "completion_tokens": len(text) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not payload.get("stream"):
+            await asyncio.sleep(latency)
+            return JSONResponse({
+                "id": "bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+
+        async def stream():
+            # Time to first token is modelled as the fixed latency, then one word per token_delay
+            await asyncio.sleep(latency)
+            for word in text.split(" "):
+                chunk = {"choices": [{"index": 0, "delta": {"content": word + " "}}], "model": payload["model"]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(token_delay)
+            yield f"data: {json.dumps({'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}], 'x_groq': {'usage': usage}})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+class FakeGroqServer:
+    """Runs the fake Groq API with uvicorn on a background thread"""
+
+    def __init__(self, port: int, latency: float, token_delay: float):
+        self.app = create_app(latency, token_delay)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.url = f"http://127.0.0.1:{port}/openai/v1/chat/completions"
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
@@ -0,0 +1,129 @@
+"""
+Stand-in for the Azure Speech SDK used by the benchmark harness
+Only the recognizer is faked: the app's own ffmpeg decode, push stream and
+continuous recognition code run unchanged against it. Once the push stream is
+closed, the fake recognizer waits a configurable latency, then reports one
+utterance and ends the session, firing callbacks from its own thread as the
+SDK does
+"""
+import io
+import math
+import wave
+import struct
+import threading
+from types import SimpleNamespace
+
+ANSWER = "I led the migration of our monolith to services and cut p99 latency in half."
+TICKS_PER_SECOND = 10_000_000
+PCM_BYTES_PER_SECOND = 16000 * 2
+
+
+class _Signal:
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, callback):
+        self._callbacks.append(callback)
+
+    def fire(self, event):
+        for callback in self._callbacks:
+            callback(event)
+
+
+class _Done:
+    def get(self):
+        return None
+
+
+class PushAudioInputStream:
+    def __init__(self, stream_format=None):
+        self.stream_format = stream_format
+        self.bytes_written = 0
+        self.closed = threading.Event()
+
+    def write(self, chunk: bytes):
+        self.bytes_written += len(chunk)
+
+    def close(self):
+        self.closed.set()
+
+
+class AudioStreamFormat:
+    def __init__(self, samples_per_second=None, bits_per_sample=None, channels=None, compressed_stream_format=None):
+        self.compressed = compressed_stream_format is not None
+
+
+class AudioConfig:
+    def __init__(self, stream: PushAudioInputStream):
+        self.stream = stream
+
+
+def make_sdk(latency: float):
+    """Module-like object exposing the parts of azure.cognitiveservices.speech the app uses"""
+    result_reason = SimpleNamespace(RecognizedSpeech="RecognizedSpeech")
+
+    class SpeechRecognizer:
+        def __init__(self, speech_config=None, audio_config: AudioConfig = None):
+            self.stream = audio_config.stream
+            self.recognizing = _Signal()
+            self.recognized = _Signal()
+            self.canceled = _Signal()
+            self.session_stopped = _Signal()
+            self._stopped = threading.Event()
+
+        def _session(self):
+            self.stream.closed.wait()
+            if self._stopped.wait(latency):
+                return
+            duration = self.stream.bytes_written / PCM_BYTES_PER_SECOND
+            result = SimpleNamespace(
+                reason=result_reason.RecognizedSpeech,
+                text=ANSWER,
+                offset=0,
+                # Compressed audio has no fixed byte rate; report it as within every limit
+                duration=0 if self.stream.stream_format.compressed else int(duration * TICKS_PER_SECOND)
+            )
+            self.recognized.fire(SimpleNamespace(result=result))
+            self.session_stopped.fire(SimpleNamespace())
+
+        def start_continuous_recognition(self):
+            threading.Thread(target=self._session, daemon=True).start()
+
+        def stop_continuous_recognition(self):
+            self._stopped.set()
+
+        def start_continuous_recognition_async(self):
+            self.start_continuous_recognition()
+            return _Done()
+
+        def stop_continuous_recognition_async(self):
+            self.stop_continuous_recognition()
+            return _Done()
+
+    return SimpleNamespace(
+        ResultReason=result_reason,
+        CancellationReason=SimpleNamespace(Error="Error"),
+        AudioStreamContainerFormat=SimpleNamespace(ANY="ANY"),
+        SpeechRecognizer=SpeechRecognizer,
+        audio=SimpleNamespace(
+            AudioConfig=AudioConfig,
+            AudioStreamFormat=AudioStreamFormat,
+            PushAudioInputStream=PushAudioInputStream
+        )
+    )
+
+
+def sine_wav(seconds: float = 2.0) -> bytes:
+    """A short 16 kHz mono WAV recording for the app's ffmpeg decode step"""
+    samples = int(16000 * seconds)
+    frames = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * index / 16000))) for index in range(samples)
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(16000)
+        out.writeframes(frames)
+    return buffer.getvalue()
+
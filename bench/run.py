@@ -0,0 +1,253 @@
+"""
+Offline load test for the interview API
+
+Drives scripted interviews (resume upload -> job details -> N question/answer
+turns -> evaluate) against the FastAPI app in-process, with Groq, Azure Speech
+and MongoDB replaced by local stand-ins, and reports per-endpoint latency
+percentiles and throughput.
+
+    python -m bench.run --interviews 50 --concurrency 10 --turns 4 --output bench_results.json
+    python -m bench.check_limits     # upload body caps (413 for chunked oversized bodies)
+
+Only the Azure Speech recognizer is stubbed (bench/fake_speech.py): answers are
+decoded with the app's own ffmpeg pipeline, so ffmpeg must be on PATH.
+Pass --mongo-uri to benchmark against a real (local) MongoDB instead of mongomock.
+The LLM response cache is off unless --llm-cache is given: every scripted
+interview sends the same prompts, so with it on the run measures cache hits
+rather than model calls. Cache lookups are reported separately either way.
+"""
+import os
+import sys
+import json
+import math
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import statistics
+from collections import defaultdict
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interviews", type=int, default=20, help="total interviews to run")
+    parser.add_argument("--concurrency", type=int, default=5, help="interviews in flight at once")
+    parser.add_argument("--turns", type=int, default=3, help="question/answer turns per interview")
+    parser.add_argument("--stream", action="store_true", help="use /question/generate/stream")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake Groq latency (time to first token), seconds")
+    parser.add_argument("--llm-token-delay", type=float, default=0.01, help="fake Groq delay between streamed tokens, seconds")
+    parser.add_argument("--speech-latency", type=float, default=0.3, help="fake recognizer latency after the audio ends, seconds")
+    parser.add_argument("--mongo-uri", default=None, help="real MongoDB to use instead of mongomock")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="keep the LLM response cache on; every scripted interview sends the same prompts, so most calls hit it")
+    parser.add_argument("--output", default="bench_results.json", help="where to write machine-readable results")
+    return parser.parse_args(argv)
+
+
+def make_resume_pdf() -> bytes:
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Jane Doe\nSenior Backend Engineer\n\nExperience\n- Built Python APIs serving 10k rps\n- Led MongoDB migrations", fontsize=11)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def install_fakes(args, groq_url: str):
+    """Points the app's external dependencies at local stand-ins"""
+    from services import groq_api, speech
+    from db.mongo_client import mongo_client
+    from bench.fake_speech import make_sdk
+
+    groq_api.GROQ_API_URL = groq_url
+
+    # Only the SDK is replaced; decoding, push streams and the speech worker pool run for real
+    fake_sdk = make_sdk(args.speech_latency)
+    speech._sdk = lambda: fake_sdk
+    speech.get_speech_config = lambda: None
+
+    if args.mongo_uri is None:
+        from mongomock_motor import AsyncMongoMockClient
+
+        async def ping():
+            return None
+
+        mongo_client.use_client(AsyncMongoMockClient())
+        mongo_client.ping = ping
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+            if endpoint.endswith("/stream"):
+                # Streams report failures in-band as an SSE error event
+                ok = ok and "event: error" not in response.text
+        except Exception:
+            response, ok = None, False
+        self.record(endpoint, time.perf_counter() - start, ok)
+        return response
+
+    def record(self, endpoint: str, elapsed: float, ok: bool = True):
+        if ok:
+            self.latencies[endpoint].append(elapsed)
+        else:
+            self.errors[endpoint] += 1
+
+    def report(self, wall_time: float) -> dict:
+        endpoints = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            samples = sorted(self.latencies.get(endpoint, []))
+            endpoints[endpoint] = {
+                "count": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "p50_ms": _percentile(samples, 50) * 1000,
+                "p95_ms": _percentile(samples, 95) * 1000,
+                "p99_ms": _percentile(samples, 99) * 1000,
+                "mean_ms": (statistics.fmean(samples) if samples else 0.0) * 1000,
+                "rps": len(samples) / wall_time if wall_time else 0.0
+            }
+        return endpoints
+
+
+def _percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    # Nearest-rank percentile
+    rank = math.ceil(pct / 100 * len(samples))
+    return samples[min(max(rank, 1), len(samples)) - 1]
+
+
+async def run_interview(client, recorder: Recorder, args, resume_pdf: bytes, answer_audio: bytes):
+    response = await recorder.call(client, "/session", "POST", "/session")
+    if response is None or response.status_code != 201:
+        return
+    headers = {"X-User-ID": response.json()["user_id"]}
+    generate = "/question/generate/stream" if args.stream else "/question/generate"
+
+    await recorder.call(client, "/upload", "POST", "/upload", headers=headers,
+                        files={"file": ("resume.pdf", resume_pdf, "application/pdf")})
+    await recorder.call(client, "/job/update_details", "POST", "/job/update_details", headers=headers,
+                        data={"job_description": "Backend engineer building Python APIs on MongoDB.",
+                              "company_details": "A fast-growing hiring platform."})
+    await recorder.call(client, generate, "POST", generate, headers=headers)
+
+    for _ in range(args.turns):
+        response = await recorder.call(client, "/transcribe/", "POST", "/transcribe/", headers=headers,
+                                       files={"file": ("answer.wav", answer_audio, "audio/wav")})
+        answer = response.json().get("text") if response is not None and response.status_code == 200 else "No answer"
+        await recorder.call(client, generate, "POST", generate, headers=headers, params={"user_input": answer})
+
+    # Evaluation is asynchronous: time both the enqueue and the wait for the result
+    start = time.perf_counter()
+    response = await recorder.call(client, "/evaluate", "POST", "/evaluate", headers=headers)
+    if response is None or response.status_code != 202:
+        return
+    status_url = f"/evaluate/jobs/{response.json()['job_id']}"
+    while True:
+        response = await recorder.call(client, "/evaluate/jobs/{job_id}", "GET", status_url, headers=headers)
+        status = response.json().get("status") if response is not None and response.status_code == 200 else "failed"
+        if status in ("done", "failed"):
+            break
+        await asyncio.sleep(0.1)
+    recorder.record("evaluate (end to end)", time.perf_counter() - start, ok=status == "done")
+
+
+async def run(args) -> dict:
+    import httpx
+    from bench.fake_groq import FakeGroqServer
+    from bench.fake_speech import sine_wav
+
+    groq = FakeGroqServer(_free_port(), args.llm_latency, args.llm_token_delay)
+    groq.start()
+    install_fakes(args, groq.url)
+
+    from main import app
+
+    recorder = Recorder()
+    resume_pdf = make_resume_pdf()
+    answer_audio = sine_wav()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(client):
+        async with semaphore:
+            await run_interview(client, recorder, args, resume_pdf, answer_audio)
+
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+                start = time.perf_counter()
+                await asyncio.gather(*(bounded(client) for _ in range(args.interviews)))
+                wall_time = time.perf_counter() - start
+    finally:
+        groq.stop()
+
+    return {
+        "config": vars(args),
+        "environment": {"python": sys.version.split()[0], "platform": platform.platform()},
+        "wall_time_s": wall_time,
+        "interviews_per_s": args.interviews / wall_time if wall_time else 0.0,
+        "llm_requests": groq.app.state.requests,
+        "llm_cache": cache_lookups(),
+        "endpoints": recorder.report(wall_time)
+    }
+
+
+def cache_lookups() -> dict:
+    """LLM cache lookups so far by outcome (memory_hit, mongo_hit, miss)"""
+    from prometheus_client import REGISTRY
+
+    return {
+        result: int(REGISTRY.get_sample_value("llm_cache_requests_total", {"result": result}) or 0)
+        for result in ("memory_hit", "mongo_hit", "miss")
+    }
+
+
+def print_report(results: dict):
+    print(f"{results['config']['interviews']} interviews, concurrency {results['config']['concurrency']}, "
+          f"{results['wall_time_s']:.2f}s wall, {results['interviews_per_s']:.2f} interviews/s, "
+          f"{results['llm_requests']} LLM calls")
+    cache = results["llm_cache"]
+    print(f"LLM cache: {cache['memory_hit']} memory hits, {cache['mongo_hit']} mongo hits, {cache['miss']} misses")
+    print(f"{'endpoint':<28}{'count':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for endpoint, stats in results["endpoints"].items():
+        print(f"{endpoint:<28}{stats['count']:>7}{stats['errors']:>5}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['rps']:>9.2f}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # The app reads these at import time
+    os.environ["MONGODB_URI"] = args.mongo_uri or "mongodb://localhost:27017"
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ.setdefault("AZURE_SPEECH_KEY", "bench")
+    os.environ.setdefault("SESSION_SECRET", "bench")
+    # Set outright, not defaulted: a cache left on from the environment would serve the identical
+    # scripted prompts and never reach the fake Groq
+    os.environ["LLM_CACHE_ENABLED"] = "true" if args.llm_cache else "false"
+
+    results = asyncio.run(run(args))
+    print_report(results)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Explain-based index check for the hot MongoDB queries
+
+Seeds documents shaped like data written before the indexes existed, creates the
+app's indexes, and exits non-zero if any index could not be built or any query the
+request path depends on would fall back to a collection scan.
+
+    MONGODB_URI=mongodb://localhost:27017 python -m db.check_indexes
+
+Suitable for CI against a throwaway database (set MONGODB_DB_NAME).
+"""
+import sys
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from db.export import EXPORT_SORT, export_query
+from db.mongo_client import mongo_client
+from services.llm_cache import LLM_CACHE_COLLECTION, ensure_cache_indexes
+from services.evaluation_jobs import JOBS_COLLECTION, ensure_job_indexes
+
+# (description, collection, filter, sort)
+HOT_QUERIES = [
+    ("session by user", "user_sessions", {"user_id": "check"}, None),
+    ("interview by user", "interviews", {"user_id": "check"}, None),
+    ("resume by content hash", "resumes", {"content_hash": "check"}, None),
+    ("cached LLM response", LLM_CACHE_COLLECTION, {"_id": "check"}, None),
+    ("active evaluation job", JOBS_COLLECTION, {"user_id": "check", "active": True}, None),
+    ("claim evaluation job", JOBS_COLLECTION, {
+        "active": True,
+        "$or": [{"status": "queued"}, {"status": "running", "lease_until": {"$lt": datetime.utcnow()}}]
+    }, [("created_at", 1)]),
+    ("interview export page", "interviews", export_query(
+        datetime(2025, 1, 1), None, (datetime(2025, 1, 1), ObjectId())
+    ), EXPORT_SORT),
+]
+
+
+# Legacy documents the indexes must tolerate: resumes stored before content hashing
+LEGACY_DOCUMENTS = [
+    ("resumes", {"_id": "check-legacy-resume-1", "filename": "legacy-1.pdf", "cleaned_text": "legacy"}),
+    ("resumes", {"_id": "check-legacy-resume-2", "filename": "legacy-2.pdf", "cleaned_text": "legacy"}),
+]
+
+# Indexes ensure_indexes() must have built; its failures are only logged
+EXPECTED_INDEXES = [
+    ("user_sessions", "user_sessions_user_id"),
+    ("interviews", "interviews_user_id"),
+    ("interviews", "interviews_start_time_id"),
+    ("resumes", "resumes_content_hash"),
+]
+
+
+def plan_stages(plan) -> set:
+    """Every stage name anywhere in an explain plan"""
+    stages = set()
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.add(plan["stage"])
+        for value in plan.values():
+            stages |= plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            stages |= plan_stages(item)
+    return stages
+
+
+async def seed_legacy_documents():
+    for collection, document in LEGACY_DOCUMENTS:
+        await mongo_client.get_collection(collection).replace_one({"_id": document["_id"]}, document, upsert=True)
+
+
+async def find_missing_indexes() -> list:
+    """Returns (collection, name) for every expected index that does not exist"""
+    missing = []
+    for collection, name in EXPECTED_INDEXES:
+        if name not in await mongo_client.get_collection(collection).index_information():
+            missing.append((collection, name))
+    return missing
+
+
+async def find_collection_scans() -> list:
+    """Returns (description, stages) for every hot query whose winning plan scans a collection"""
+
+    scans = []
+    for description, collection, query, sort in HOT_QUERIES:
+        cursor = mongo_client.get_collection(collection).find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        stages = plan_stages(explanation["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in stages:
+            scans.append((description, sorted(stages)))
+    return scans
+
+
+async def main() -> int:
+    try:
+        await seed_legacy_documents()
+        await mongo_client.ensure_indexes()
+        await ensure_cache_indexes()
+        await ensure_job_indexes()
+        missing = await find_missing_indexes()
+        scans = await find_collection_scans()
+    finally:
+        mongo_client.close()
+    for collection, name in missing:
+        print(f"MISSING INDEX: {collection}.{name}")
+    for description, stages in scans:
+        print(f"COLLSCAN: {description} (plan stages: {', '.join(stages)})")
+    if not scans:
+        print(f"All {len(HOT_QUERIES)} hot queries use an index")
+    return 1 if missing or scans else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,272 @@
+"""
+Bulk export of interviews for offline analytics
+
+Streams interviews (conversation, per-turn scores and the aggregated analysis)
+through a batched cursor, so memory stays flat however many interviews match.
+Records come out in (start_time, _id) order, which the interviews_start_time_id
+index serves for any time range; the last record's start_time and _id form a
+checkpoint that a later run resumes from. NDJSON checkpoints also record how many bytes of the
+output file they cover, and a resumed run truncates the file back to that
+offset, so an interrupted run leaves no duplicate or torn records. Parquet
+files are only checkpointed once closed.
+
+    python -m db.export --output interviews.ndjson --checkpoint export.ckpt
+    python -m db.export --format parquet --output exports/ --since 2025-01-01 --fields user_id,start_time,analysis
+
+Parquet output needs pyarrow (pip install pyarrow).
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from bson import ObjectId
+from db.mongo_client import mongo_client
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+EXPORT_PARQUET_ROWS_PER_FILE = int(os.getenv("EXPORT_PARQUET_ROWS_PER_FILE", "50000"))
+
+# Top-level interview fields that may be exported; the raw resume and job text stay out by default
+EXPORTABLE_FIELDS = (
+    "user_id", "start_time", "updated_at", "message_count", "conversation", "conversation_summary",
+    "turn_scores", "analysis", "analysis_errors", "job_description", "company_details", "resume_text"
+)
+DEFAULT_EXPORT_FIELDS = (
+    "user_id", "start_time", "message_count", "conversation", "turn_scores", "analysis", "analysis_errors"
+)
+
+
+class ExportError(ValueError):
+    pass
+
+
+# Sort order of every export; matches the interviews_start_time_id index
+EXPORT_SORT = [("start_time", 1), ("_id", 1)]
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Comma-separated field list (dotted paths allowed) checked against EXPORTABLE_FIELDS"""
+    if not fields:
+        return list(DEFAULT_EXPORT_FIELDS)
+    parsed = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in parsed if field.split(".", 1)[0] not in EXPORTABLE_FIELDS]
+    if unknown:
+        raise ExportError(f"Unknown export fields: {', '.join(unknown)}")
+    return parsed
+
+
+def format_checkpoint(document: dict) -> str:
+    """Checkpoint after a record: <start_time ISO 8601>,<_id>"""
+    return f"{document['start_time'].isoformat()},{document['_id']}"
+
+
+def parse_checkpoint(after: Optional[str]) -> Optional[Tuple[datetime, ObjectId]]:
+    """(start_time, _id) from a format_checkpoint() string"""
+    if not after:
+        return None
+    start_time, _, last_id = after.rpartition(",")
+    try:
+        start_time = datetime.fromisoformat(start_time)
+    except ValueError:
+        raise ExportError(f"Invalid checkpoint: {after}")
+    if not ObjectId.is_valid(last_id):
+        raise ExportError(f"Invalid checkpoint: {after}")
+    return start_time, ObjectId(last_id)
+
+
+def export_query(since: datetime = None, until: datetime = None, after: Tuple[datetime, ObjectId] = None) -> dict:
+    query = {}
+    if since or until:
+        query["start_time"] = {}
+        if since:
+            query["start_time"]["$gte"] = since
+        if until:
+            query["start_time"]["$lt"] = until
+    if after:
+        start_time, last_id = after
+        resume = {"$or": [{"start_time": {"$gt": start_time}}, {"start_time": start_time, "_id": {"$gt": last_id}}]}
+        query = {"$and": [query, resume]} if query else resume
+    return query
+
+
+async def iter_interviews(
+    fields: List[str],
+    since: datetime = None,
+    until: datetime = None,
+    after: Tuple[datetime, ObjectId] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[dict]:
+    """
+    Matching interviews in (start_time, _id) order, fetched batch_size at a time
+    start_time is always returned alongside _id since checkpoints are built from it
+    """
+    cursor = mongo_client.get_collection("interviews").find(
+        export_query(since, until, after),
+        {"start_time": 1, **{field: 1 for field in fields}},
+        batch_size=batch_size
+    ).sort(EXPORT_SORT)
+    async for document in cursor:
+        yield document
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def to_ndjson(document: dict) -> str:
+    return json.dumps(document, default=_json_default, ensure_ascii=False) + "\n"
+
+
+# --- CLI ---
+
+def _read_checkpoint(path: Optional[str]) -> dict:
+    """{"after": format_checkpoint() of the last record, "offset": bytes of NDJSON output it covers}, or {}"""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            content = f.read().strip()
+        if content:
+            try:
+                return json.loads(content)
+            except ValueError:
+                raise ExportError(f"Invalid checkpoint file: {path}")
+    return {}
+
+
+def _write_checkpoint(path: Optional[str], after: Optional[str], offset: Optional[int] = None):
+    if path and after is not None:
+        checkpoint = {"after": after}
+        if offset is not None:
+            checkpoint["offset"] = offset
+        # Replace atomically so an interrupted run never leaves a torn checkpoint
+        with open(path + ".tmp", "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(path + ".tmp", path)
+
+
+async def export_ndjson(args, fields, after, offset: Optional[int] = None) -> int:
+    count, last = 0, None
+    resume = after is not None and os.path.exists(args.output)
+    with open(args.output, "r+b" if resume else "wb") as out:
+        if resume:
+            # Continue the file an interrupted run was writing, dropping whatever it
+            # wrote past its last checkpoint
+            if offset is None:
+                out.seek(0, os.SEEK_END)
+            else:
+                out.seek(offset)
+                out.truncate()
+        async for document in iter_interviews(fields, args.since, args.until, after, args.batch_size):
+            out.write(to_ndjson(document).encode("utf-8"))
+            count += 1
+            last = format_checkpoint(document)
+            if count % args.batch_size == 0:
+                out.flush()
+                _write_checkpoint(args.checkpoint, last, out.tell())
+        out.flush()
+        _write_checkpoint(args.checkpoint, last, out.tell())
+    return count
+
+
+# Columns with a native type; everything else is a string, with nested values as JSON
+TYPED_COLUMNS = {"start_time": "timestamp", "updated_at": "timestamp", "message_count": "int64"}
+
+
+def _columnar_schema(pa, fields: List[str]):
+    types = {"timestamp": pa.timestamp("us"), "int64": pa.int64()}
+    return pa.schema(
+        [("_id", pa.string())] + [(field, types.get(TYPED_COLUMNS.get(field), pa.string())) for field in fields]
+    )
+
+
+def _columnar_row(document: dict, fields: List[str]) -> dict:
+    row = {"_id": str(document["_id"])}
+    for field in fields:
+        value = document
+        for part in field.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is not None and field not in TYPED_COLUMNS and not isinstance(value, str):
+            value = json.dumps(value, default=_json_default, ensure_ascii=False)
+        row[field] = value
+    return row
+
+
+async def export_parquet(args, fields, after) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+
+    os.makedirs(args.output, exist_ok=True)
+    schema = _columnar_schema(pa, fields)
+    count, rows, writer, last = 0, [], None, None
+    file_rows = 0
+
+    def flush(close: bool):
+        nonlocal rows, writer, file_rows
+        if rows:
+            table = pa.Table.from_pylist(rows, schema=schema)
+            if writer is None:
+                name = f"interviews-{rows[0]['_id']}.parquet"
+                writer = pq.ParquetWriter(os.path.join(args.output, name), schema)
+            writer.write_table(table)
+            file_rows += len(rows)
+            rows = []
+        if close and writer is not None:
+            writer.close()
+            writer, file_rows = None, 0
+            # A parquet file is only readable once closed, so only closed files advance the checkpoint
+            _write_checkpoint(args.checkpoint, last)
+
+    async for document in iter_interviews(fields, args.since, args.until, after, args.batch_size):
+        rows.append(_columnar_row(document, fields))
+        count += 1
+        last = format_checkpoint(document)
+        if len(rows) >= args.batch_size:
+            flush(close=file_rows + len(rows) >= EXPORT_PARQUET_ROWS_PER_FILE)
+    flush(close=True)
+    return count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="NDJSON file, or directory for parquet files")
+    parser.add_argument("--format", choices=("ndjson", "parquet"), default="ndjson")
+    parser.add_argument("--fields", help=f"comma-separated fields (default: {','.join(DEFAULT_EXPORT_FIELDS)})")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="start_time lower bound (inclusive), ISO 8601")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="start_time upper bound (exclusive), ISO 8601")
+    parser.add_argument("--checkpoint", help="file holding the last exported record (and NDJSON offset); resumed from when present")
+    parser.add_argument("--after", help="export interviews after this <start_time>,<_id> checkpoint (overrides --checkpoint)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        fields = parse_fields(args.fields)
+        checkpoint = {} if args.after else _read_checkpoint(args.checkpoint)
+        after = parse_checkpoint(args.after or checkpoint.get("after"))
+    except ExportError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    try:
+        if args.format == "parquet":
+            count = await export_parquet(args, fields, after)
+        else:
+            count = await export_ndjson(args, fields, after, checkpoint.get("offset"))
+    finally:
+        mongo_client.close()
+    print(f"Exported {count} interviews to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,42 +1,245 @@
 import os
-from pymongo import MongoClient
+import time
+import asyncio
+import logging
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+from services.metrics import MongoCommandMetrics
 from dotenv import load_dotenv
-import os
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "interview_db")
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_READY_CACHE_SECONDS = float(os.getenv("MONGODB_READY_CACHE_SECONDS", "5"))
+# IndexOptionsConflict, IndexKeySpecsConflict: an index of that name exists with other options
+INDEX_CONFLICT_CODES = (85, 86)
+# Sessions and unfinished interviews untouched for this long are removed by TTL indexes on updated_at;
+# interviews stop being "in progress" once evaluated and are then kept. 0 keeps them forever
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(30 * 24 * 3600)))
+INTERVIEW_TTL_SECONDS = int(os.getenv("INTERVIEW_TTL_SECONDS", str(90 * 24 * 3600)))
+
+
 class MongoDBClient:
+    """
+    Lazily connected MongoDB client
+    Nothing touches the network until the first query (or the startup warm-up),
+    so importing the app never blocks on MongoDB
+    """
+
     def __init__(self):
-        try:
+        self._client = None
+        self._db = None
+        self._ready_at = 0.0
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        if self._client is None:
             mongo_uri = os.getenv("MONGODB_URI")
             if not mongo_uri:
-                raise ValueError("MONGODB_URI not found in environment variables")
+                raise RuntimeError("Failed to connect to MongoDB: MONGODB_URI not found in environment variables")
+
+            self._client = AsyncIOMotorClient(
+                mongo_uri,
+                maxPoolSize=MONGODB_MAX_POOL_SIZE,
+                minPoolSize=MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                event_listeners=[MongoCommandMetrics()]
+            )
+        return self._client
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = self.client[MONGODB_DB_NAME]
+        return self._db
 
-            self.client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-            self.client.admin.command("ping")  # Check connection
-            self.db = self.client["interview_db"]
+    def use_client(self, client):
+        """Swap in an already constructed (e.g. mock) client"""
+        self._client = client
+        self._db = client[MONGODB_DB_NAME]
+
+    async def ping(self):
+        try:
+            await self.client.admin.command("ping")  # Check connection
         except Exception as e:
             raise RuntimeError(f"Failed to connect to MongoDB: {e}")
+        self._ready_at = time.monotonic()
+
+    async def is_ready(self, timeout: float = 2.0) -> bool:
+        """Readiness check; a recent successful ping is reused to keep probes cheap"""
+        if time.monotonic() - self._ready_at < MONGODB_READY_CACHE_SECONDS:
+            return True
+        try:
+            await asyncio.wait_for(self.ping(), timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MongoDB readiness check failed: {e}")
+            return False
+
+    async def warm_up(self):
+        """Opens the connection pool in the background after startup"""
+        try:
+            await self.ping()
+        except Exception as e:
+            logger.warning(f"MongoDB warm-up failed, will retry on first use: {e}")
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._db = None
 
     def get_collection(self, name: str):
         return self.db[name]
 
+    async def _ensure_ttl_index(self, collection, ttl_seconds: int, name: str, partial_filter: dict = None):
+        if ttl_seconds <= 0:
+            return
+        options = {"partialFilterExpression": partial_filter} if partial_filter else {}
+        try:
+            await collection.create_index("updated_at", expireAfterSeconds=ttl_seconds, name=name, **options)
+        except OperationFailure:
+            # The TTL changed since the index was created; update it in place
+            await self.db.command("collMod", collection.name, index={"name": name, "expireAfterSeconds": ttl_seconds})
+
+    async def ensure_indexes(self):
+        """
+        Creates the indexes behind every hot lookup plus TTL expiry for abandoned data
+        Runs at startup; a failure (e.g. duplicates blocking a unique index) is logged, not raised
+        """
+        indexes = [
+            (self.get_user_session_collection(), "user_id", "user_sessions_user_id", None),
+            (self.get_interview_collection(), "user_id", "interviews_user_id", None),
+            # Resumes stored before hashing have no content_hash; a plain unique index
+            # would count each of them as a duplicate null
+            (self.get_resume_collection(), "content_hash", "resumes_content_hash", {"content_hash": {"$exists": True}}),
+        ]
+        for collection, field, name, partial_filter in indexes:
+            options = {"partialFilterExpression": partial_filter} if partial_filter else {}
+            try:
+                try:
+                    await collection.create_index(field, unique=True, name=name, **options)
+                except OperationFailure as e:
+                    if e.code not in INDEX_CONFLICT_CODES:
+                        raise
+                    # Created earlier with other options; rebuild it with the current ones
+                    await collection.drop_index(name)
+                    await collection.create_index(field, unique=True, name=name, **options)
+            except Exception as e:
+                logger.warning(f"Could not create index {name}: {e}")
+        try:
+            # Time-range exports (db.export, /export/interviews) page through this order
+            await self.get_interview_collection().create_index(
+                [("start_time", 1), ("_id", 1)], name="interviews_start_time_id"
+            )
+        except Exception as e:
+            logger.warning(f"Could not create index interviews_start_time_id: {e}")
+        try:
+            await self._ensure_ttl_index(self.get_user_session_collection(), SESSION_TTL_SECONDS, "user_sessions_ttl")
+            # Replaced by interviews_in_progress_ttl: it also expired evaluated interviews
+            if "interviews_ttl" in await self.get_interview_collection().index_information():
+                await self.get_interview_collection().drop_index("interviews_ttl")
+            await self._ensure_ttl_index(
+                self.get_interview_collection(), INTERVIEW_TTL_SECONDS, "interviews_in_progress_ttl",
+                partial_filter={"in_progress": True}
+            )
+        except Exception as e:
+            logger.warning(f"Could not create session/interview TTL indexes: {e}")
+
+    # --- Sessions ---
+
     def get_user_session_collection(self):
         return self.db["user_sessions"]
 
-    def get_user_session(self, user_id: str):
-        return self.get_user_session_collection().find_one({"user_id": user_id})
+    async def get_user_session(self, user_id: str, projection: dict = None):
+        return await self.get_user_session_collection().find_one({"user_id": user_id}, projection)
 
-    def update_user_session(self, user_id: str, data: dict):
-        self.get_user_session_collection().update_one(
+    async def update_user_session(self, user_id: str, data: dict):
+        await self.get_user_session_collection().update_one(
             {"user_id": user_id},
-            {"$set": data},
+            {"$set": {**data, "updated_at": datetime.utcnow()}},
             upsert=True
         )
 
+    # --- Interviews ---
+
+    def get_interview_collection(self):
+        return self.db["interviews"]
+
+    async def get_interview(self, user_id: str, projection: dict = None):
+        return await self.get_interview_collection().find_one({"user_id": user_id}, projection)
+
+    async def update_interview(self, user_id: str, update: dict, condition: dict = None):
+        update = {**update, "$set": {**update.get("$set", {}), "updated_at": datetime.utcnow()}}
+        await self.get_interview_collection().update_one({"user_id": user_id, **(condition or {})}, update)
+
+    async def start_interview(self, user_id: str, context: dict, conversation: list):
+        """Write the static interview context once, replacing any previous interview"""
+        now = datetime.utcnow()
+        await self.get_interview_collection().replace_one(
+            {"user_id": user_id},
+            {
+                "user_id": user_id,
+                **context,
+                "conversation": conversation,
+                "message_count": len(conversation),
+                "start_time": now,
+                "updated_at": now,
+                # Cleared once the interview is evaluated so the TTL index no longer applies
+                "in_progress": True
+            },
+            upsert=True
+        )
+
+    async def append_conversation(self, user_id: str, entries: list) -> bool:
+        """Atomically append turns to the interview conversation"""
+        result = await self.get_interview_collection().update_one(
+            {"user_id": user_id},
+            {
+                "$push": {"conversation": {"$each": entries}},
+                "$inc": {"message_count": len(entries)},
+                "$set": {"updated_at": datetime.utcnow()}
+            }
+        )
+        return result.matched_count > 0
+
+    # --- Resumes ---
+
+    def get_resume_collection(self):
+        return self.db["resumes"]
+
+    async def find_resume_by_hash(self, resume_hash: str, projection: dict = None):
+        return await self.get_resume_collection().find_one({"content_hash": resume_hash}, projection)
+
+    async def save_resume(self, resume_hash: str, resume_doc: dict):
+        """Store a parsed resume once per content hash and return its id"""
+        result = await self.get_resume_collection().find_one_and_update(
+            {"content_hash": resume_hash},
+            {"$setOnInsert": {"content_hash": resume_hash, **resume_doc}},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return result["_id"]
+
 # Singleton export
 mongo_client = MongoDBClient()
 get_collection = mongo_client.get_collection
 get_user_session = mongo_client.get_user_session
 update_user_session = mongo_client.update_user_session
+get_interview = mongo_client.get_interview
+update_interview = mongo_client.update_interview
+start_interview = mongo_client.start_interview
+append_conversation = mongo_client.append_conversation
+find_resume_by_hash = mongo_client.find_resume_by_hash
+save_resume = mongo_client.save_resume
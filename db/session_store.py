@@ -0,0 +1,107 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+from db.mongo_client import get_user_session, update_user_session
+
+# Optional cross-request cache; a TTL of 0 keeps sessions request-scoped only
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "0"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+
+
+class SessionCache:
+    """Bounded LRU of partially loaded session documents with a TTL"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, fields = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return dict(fields)
+
+    def merge(self, user_id: str, fields: dict):
+        if not self.enabled:
+            return
+        entry = self._entries.pop(user_id, None)
+        cached = entry[1] if entry and entry[0] >= time.monotonic() else {}
+        self._entries[user_id] = (time.monotonic() + self.ttl, {**cached, **fields})
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+
+session_cache = SessionCache(SESSION_CACHE_SIZE, SESSION_CACHE_TTL)
+
+
+class UserSession:
+    """
+    Request-scoped view of a user's session document
+    Only the fields a route asks for are read, and all updates made during the
+    request are written back in a single upsert by commit()
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self._data: dict = {}
+        self._loaded: set = set()
+        self._pending: dict = {}
+
+    async def load(self, fields: Iterable[str]):
+        missing = [field for field in fields if field not in self._loaded]
+        if not missing:
+            return
+
+        cached = session_cache.get(self.user_id)
+        if cached is not None:
+            for field in missing:
+                if field in cached:
+                    self._data.setdefault(field, cached[field])
+                    self._loaded.add(field)
+            missing = [field for field in missing if field not in self._loaded]
+            if not missing:
+                return
+
+        projection = {"_id": 0, **{field: 1 for field in missing}}
+        document = await get_user_session(self.user_id, projection) or {}
+        fetched = {field: document.get(field) for field in missing}
+        for field, value in fetched.items():
+            self._data.setdefault(field, value)
+        self._loaded.update(missing)
+        session_cache.merge(self.user_id, fetched)
+
+    def get(self, key: str, default=None):
+        value = self._data.get(key)
+        return default if value is None else value
+
+    def update(self, data: dict):
+        self._data.update(data)
+        self._loaded.update(data)
+        self._pending.update(data)
+
+    async def commit(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await update_user_session(self.user_id, pending)
+        except Exception:
+            self._pending = {**pending, **self._pending}
+            raise
+        session_cache.merge(self.user_id, pending)
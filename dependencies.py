@@ -1,21 +1,77 @@
 from fastapi import Request, HTTPException, Depends
-from db.mongo_client import get_user_session, update_user_session
-import uuid
+from starlette.datastructures import MutableHeaders
+from db.session_store import UserSession
+from services.session_ids import issue_session_id, verify_session_id
+import os
+import hmac
 
 async def get_user_id(request: Request):
-    # The user_id should already be set by the add_user_id_header middleware
-    if hasattr(request.state, "user_id") and request.state.user_id:
-        return request.state.user_id
-    
-    # Fallback: This part should ideally not be hit if middleware is correctly configured
+    """
+    The caller's session id from the X-User-ID header
+    Requests without one are issued a new signed id, returned in the X-User-ID response
+    header by UserIdHeaderMiddleware; no session document exists until a route writes state
+    """
+    user_id = getattr(request.state, "user_id", None)
+    if user_id:
+        return user_id
+
     user_id = request.headers.get("X-User-ID")
-    if not user_id:
-        user_id = str(uuid.uuid4())
+    if user_id:
+        if not verify_session_id(user_id):
+            raise HTTPException(status_code=401, detail="Invalid session id, request a new one from POST /session")
+    else:
+        user_id = issue_session_id()
+        request.state.issued_user_id = user_id
+    request.state.user_id = user_id
     return user_id
 
-async def get_user_session_data(user_id: str = Depends(get_user_id)):
-    session_data = get_user_session(user_id)
-    if not session_data:
-        session_data = {"user_id": user_id, "messages": []}
-        update_user_session(user_id, session_data)
-    return session_data
\ No newline at end of file
+def session_fields(*fields: str):
+    """
+    Dependency factory returning the request's UserSession with `fields` loaded
+    The session is shared by every dependency of the request, so each field is
+    read at most once, and pending updates are flushed when the request succeeds
+    """
+    async def get_session(request: Request, user_id: str = Depends(get_user_id)) -> UserSession:
+        session = getattr(request.state, "session", None)
+        if session is None:
+            session = UserSession(user_id)
+            request.state.session = session
+        await session.load(fields)
+        yield session
+        # Routes normally commit before responding; this catches anything left over
+        await session.commit()
+
+    return get_session
+
+async def require_admin(request: Request):
+    # Operational endpoints are disabled unless ADMIN_TOKEN is configured
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+class UserIdHeaderMiddleware:
+    """
+    Returns ids issued by get_user_id in the X-User-ID response header
+    Ids are resolved lazily by the dependency, so health checks and other
+    stateless endpoints never mint one
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_user_id(message):
+            if message["type"] == "http.response.start":
+                # request.state is backed by scope["state"]
+                issued_user_id = scope.get("state", {}).get("issued_user_id")
+                if issued_user_id:
+                    MutableHeaders(scope=message).append("X-User-ID", issued_user_id)
+            await send(message)
+
+        await self.app(scope, receive, send_with_user_id)
@@ -2,9 +2,20 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import logging
-import uuid
-from fastapi import FastAPI, Request
-from dependencies import get_user_id
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from dependencies import UserIdHeaderMiddleware
+from services.groq_api import close_http_client
+from db.mongo_client import mongo_client
+from services.pdf_parser import shutdown_executor as shutdown_pdf_executor
+from services.speech import shutdown_executor as shutdown_speech_executor
+from services.metrics import RequestMetricsMiddleware, render_metrics
+from services.admission import AdmissionMiddleware
+from services.llm_cache import ensure_cache_indexes
+from services.evaluation_jobs import ensure_job_indexes, worker_pool as evaluation_workers
+from services.session_ids import check_session_secret
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,25 +25,42 @@ from routes.transcription import transcription_router
 from routes.job import job_router
 from routes.question import question_router
 from routes.evaluate import router as evaluate_router
+from routes.debug import debug_router
+from routes.session import session_router
+from routes.interview_ws import interview_ws_router
+from routes.export import export_router
 
-app = FastAPI()
+async def warm_up_database():
+    await mongo_client.warm_up()
+    await mongo_client.ensure_indexes()
+    await ensure_cache_indexes()
+    await ensure_job_indexes()
 
-@app.middleware("http")
-async def add_user_id_header(request: Request, call_next):
-    user_id_from_header = request.headers.get("X-User-ID")
-    if not user_id_from_header:
-        user_id = str(uuid.uuid4())
-        logger.info(f"Generated new user_id: {user_id}")
-    else:
-        user_id = user_id_from_header
-        logger.info(f"Using user_id from header: {user_id}")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_session_secret()
+    # Connections are opened lazily; warming the Mongo pool must not delay startup
+    warm_up = asyncio.create_task(warm_up_database())
+    evaluation_workers.start()
+    yield
+    warm_up.cancel()
+    await evaluation_workers.stop()
+    # Close the pooled Groq and MongoDB connections and worker pools on shutdown
+    await close_http_client()
+    mongo_client.close()
+    shutdown_pdf_executor()
+    shutdown_speech_executor()
 
-    request.state.user_id = user_id
-    response = await call_next(request)
-    return response
+app = FastAPI(lifespan=lifespan)
 
-# Set session creation secret
+# Plain ASGI middleware: BaseHTTPMiddleware would wrap errors raised while the body is read
+app.add_middleware(UserIdHeaderMiddleware)
 
+# Bound concurrent uploads and transcriptions; added before CORS so rejections still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+
+# Outside admission control so its 413/408/429/503 answers are recorded with their real status
+app.add_middleware(RequestMetricsMiddleware)
 
 # Enable CORS
 app.add_middleware(
@@ -40,6 +68,7 @@ app.add_middleware(
     allow_origins=["https://interview-agent-frontend.vercel.app", "http://localhost:5173"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-User-ID"],
     allow_credentials=True
 )
 
@@ -48,6 +77,26 @@ app.include_router(transcription_router)
 app.include_router(job_router)
 app.include_router(question_router)
 app.include_router(evaluate_router)
+app.include_router(debug_router)
+app.include_router(session_router)
+app.include_router(interview_ws_router)
+app.include_router(export_router)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    # Liveness only: the process is up and serving requests
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    checks = {"mongodb": await mongo_client.is_ready()}
+    ready = all(checks.values())
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "checks": checks})
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from dependencies import require_admin
+from services.model_router import route_stats
+from services.profiler import profiler
+
+debug_router = APIRouter(prefix="/debug", dependencies=[Depends(require_admin)])
+
+@debug_router.post("/profiler/start")
+async def start_profiler(interval_ms: float = 10):
+    if interval_ms < 1:
+        raise HTTPException(status_code=400, detail="interval_ms must be at least 1")
+    profiler.start(interval=interval_ms / 1000)
+    return {"running": True, "interval_ms": interval_ms}
+
+@debug_router.post("/profiler/stop", response_class=PlainTextResponse)
+async def stop_profiler():
+    """Stops sampling and returns collapsed stacks (flamegraph.pl / speedscope format)"""
+    return profiler.stop()
+
+@debug_router.get("/profiler", response_class=PlainTextResponse)
+async def profiler_snapshot():
+    """Returns the stacks collected so far without stopping the profiler"""
+    return profiler.collapsed()
+
+
+@debug_router.get("/models")
+async def model_routes():
+    """Current task routing and rolling per-model latency and error rates"""
+    return route_stats()
@@ -1,88 +1,97 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import List, Dict, Any
-from db.mongo_client import mongo_client
-from services.groq_api import evaluate_answer
+from typing import Dict, Optional
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+import asyncio
+import os
+from db.mongo_client import get_interview
+from services.evaluation_jobs import enqueue_evaluation, get_job
 from fastapi import APIRouter, Depends, HTTPException
 from dependencies import get_user_id
 
 router = APIRouter()
 
+EVALUATION_EVENTS_POLL_SECONDS = float(os.getenv("EVALUATION_EVENTS_POLL_SECONDS", "1"))
+
 class AnalysisCategory(BaseModel):
     score: int
     summary: str
 
 class AnalysisResult(BaseModel):
-    communication_clarity: AnalysisCategory
-    role_specific_knowledge: AnalysisCategory
-    problem_solving_critical_thinking: AnalysisCategory
-    soft_skills_behavioral_competency: AnalysisCategory
-    engagement_motivation: AnalysisCategory
+    # Categories that failed or timed out are left empty and reported in `errors`
+    communication_clarity: Optional[AnalysisCategory] = None
+    role_specific_knowledge: Optional[AnalysisCategory] = None
+    problem_solving_critical_thinking: Optional[AnalysisCategory] = None
+    soft_skills_behavioral_competency: Optional[AnalysisCategory] = None
+    engagement_motivation: Optional[AnalysisCategory] = None
+    errors: Dict[str, str] = {}
 
 class ConversationEntry(BaseModel):
     role: str
     content: str
 
-@router.post("/evaluate", response_model=AnalysisResult)
-async def evaluate_interview(user_id: str = Depends(get_user_id)):
-    interview_collection = mongo_client.db["interviews"]
-    interview_data = interview_collection.find_one({"user_id": user_id})
+class EvaluationJob(BaseModel):
+    job_id: str
+    status: str
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+def _job_response(job: dict) -> EvaluationJob:
+    return EvaluationJob(
+        job_id=job["_id"],
+        status=job["status"],
+        result=job.get("result"),
+        error=job.get("error"),
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
 
+async def _get_user_job(job_id: str, user_id: str) -> dict:
+    job = await get_job(job_id)
+    if job is None or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Evaluation job not found")
+    return job
+
+@router.post("/evaluate", status_code=202, response_model=EvaluationJob)
+async def evaluate_interview(user_id: str = Depends(get_user_id)):
+    """
+    Queues an evaluation of the interview and returns the job to poll
+    Concurrent requests for the same interview share one job
+    """
+    interview_data = await get_interview(user_id, {"_id": 1})
     if not interview_data:
         raise HTTPException(status_code=404, detail="Interview not found")
 
-    conversation: List[ConversationEntry] = interview_data.get("conversation", [])
-    if not conversation:
-        raise HTTPException(status_code=400, detail="No conversation data found for evaluation")
-        
-    job_description = interview_data.get("job_description", "")
-    full_conversation_text = "\n".join([f"{entry['role']}: {entry['content']}" for entry in conversation])
+    job = await enqueue_evaluation(user_id)
+    return _job_response(job)
 
-    # Extract the last user answer and the last question from the conversation
-    user_answer = next((entry['content'] for entry in reversed(conversation) if entry['role'] == 'user'), "")
-    question = next((entry['content'] for entry in reversed(conversation) if entry['role'] == 'assistant'), "")
+@router.get("/evaluate/jobs/{job_id}", response_model=EvaluationJob)
+async def get_evaluation_job(job_id: str, user_id: str = Depends(get_user_id)):
+    return _job_response(await _get_user_job(job_id, user_id))
 
-    categories = {
-        "communication_clarity": {
-            "prompt": "Analyze the candidate's communication and clarity. Score from 1-10. Summarize in 2 sentences: Sentence structure, clarity, filler words, fluency, answer length, coherence, logical flow."
-        },
-        "role_specific_knowledge": {
-            "prompt": "Analyze the candidate's role-specific knowledge and technical depth. Score from 1-10. Summarize in 2 sentences: How well they address technical/domain-specific questions, use of correct terminology and methods, logical explanations of concepts or processes."
-        },
-        "problem_solving_critical_thinking": {
-            "prompt": "Analyze the candidate's problem-solving and critical thinking. Score from 1-10. Summarize in 2 sentences: Whether the answer follows a logical framework (e.g., STAR, cause-effect), creativity in solutions or handling ambiguity, structured thinking."
-        },
-        "soft_skills_behavioral_competency": {
-            "prompt": "Analyze the candidate's soft skills and behavioral competency. Score from 1-10. Summarize in 2 sentences: Emotional tone (e.g., empathy, ownership, humility), teamwork, leadership, handling feedback or conflict, use of personal examples and reflection."
-        },
-        "engagement_motivation": {
-            "prompt": "Analyze the candidate's engagement and motivation. Score from 1-10. Summarize in 2 sentences: Energy and enthusiasm for the role, relevance of their questions or curiosity shown, clear understanding of the company/mission."
-        }
-    }
+@router.get("/evaluate/jobs/{job_id}/events")
+async def stream_evaluation_job(job_id: str, user_id: str = Depends(get_user_id)):
+    """Server-sent events: a `status` event on every change, ending with the final job state"""
+    job = await _get_user_job(job_id, user_id)
 
-    analysis_results = {}
-    for category_name, category_info in categories.items():
-        try:
-            llm_response = evaluate_answer(
-                user_answer=user_answer,
-                job_description=job_description,
-                question=question,
-                category=category_name,
-                analysis_criteria=category_info['prompt']
-            )
-            # The evaluate_answer function returns a string like 'Score: [score]\nSummary: [summary]'
-            score_line, summary_line = llm_response.split('\n', 1)
-            score = int(score_line.split(': ')[1])
-            summary = summary_line.split(': ')[1]
-            # Convert Pydantic model to dictionary for MongoDB storage
-            analysis_results[category_name] = AnalysisCategory(score=score, summary=summary).dict()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"LLM evaluation failed for {category_name}: {str(e)}")
+    async def event_stream():
+        current = job
+        last_status = None
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                payload = _job_response(current).json()
+                yield f"event: status\ndata: {payload}\n\n"
+            if current["status"] in ("done", "failed"):
+                return
+            await asyncio.sleep(EVALUATION_EVENTS_POLL_SECONDS)
+            current = await get_job(job_id) or current
 
-    # Update MongoDB with the analysis results
-    interview_collection.update_one(
-        {"user_id": user_id},
-        {"$set": {"analysis": analysis_results}}
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-
-    return AnalysisResult(**analysis_results)
\ No newline at end of file
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from dependencies import require_admin
+from db.export import EXPORT_BATCH_SIZE, ExportError, iter_interviews, parse_checkpoint, parse_fields, to_ndjson
+
+export_router = APIRouter(prefix="/export", dependencies=[Depends(require_admin)])
+
+@export_router.get("/interviews")
+async def export_interviews(
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+):
+    """
+    Streams matching interviews as NDJSON in (start_time, _id) order
+    To resume an interrupted export pass the last record received as
+    after=<start_time>,<_id>; every record includes both fields
+    """
+    try:
+        projection = parse_fields(fields)
+        checkpoint = parse_checkpoint(after)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 1 <= batch_size <= 10000:
+        raise HTTPException(status_code=400, detail="batch_size must be between 1 and 10000")
+
+    async def lines():
+        async for document in iter_interviews(projection, since, until, checkpoint, batch_size):
+            yield to_ndjson(document)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
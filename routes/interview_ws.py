@@ -0,0 +1,254 @@
+"""
+WebSocket interview session
+
+One connection carries a whole interview. The client sends JSON text frames and
+binary audio frames; the server answers with JSON text frames.
+
+Client -> server
+    {"type": "start"}                             start the interview, streams the first question
+    {"type": "answer_start", "format": "pcm"}     begin an answer ("compressed" or "pcm" audio)
+    <binary frames>                               audio chunks, recognized as they arrive
+    {"type": "answer_end"}                        end the answer, streams the next question
+    {"type": "answer", "text": "..."}             typed answer instead of audio
+
+Server -> client
+    {"type": "partial", "text": "..."}            running transcript while the candidate speaks
+    {"type": "transcript", "text": "..."}         final transcript of the answer
+    {"type": "token", "token": "..."}             next question as it is generated
+    {"type": "question", "question": "...", "interview_id": "..."}
+    {"type": "error", "detail": "...", "retry_after": 1}
+"""
+import math
+import json
+import asyncio
+import logging
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from db.mongo_client import get_interview, append_conversation
+from db.session_store import UserSession
+from routes.question import build_question_messages, load_interview_context, store_question
+from services.context_builder import CONTEXT_WINDOW_MESSAGES, conversation_window_projection, update_conversation_summary
+from services.evaluation import score_pending_turns_in_background
+from services.groq_api import GroqRateLimitError
+from services.model_router import route_llm_stream
+from services.profile import get_interview_profiles
+from services.session_ids import verify_session_id
+from services.speech import TRANSCRIBE_MAX_BYTES, SpeechRecognitionError, StreamingRecognizer
+
+logger = logging.getLogger(__name__)
+
+interview_ws_router = APIRouter(prefix="/interview")
+
+# Follow-up work (summary, scoring) outlives the connection that started it
+_background_tasks: set = set()
+
+
+def _run_in_background(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+class InterviewConnection:
+    """
+    State of one live interview
+    The session fields and the recent conversation window are read once and then
+    kept in memory; each turn is persisted with a single append as it completes
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.session = UserSession(user_id)
+        # Same shape as a conversation_window_projection() read
+        self.window: Optional[dict] = None
+        self.recognizer: Optional[StreamingRecognizer] = None
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, data: dict):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(data))
+
+    async def _send_partial_async(self, text: str):
+        try:
+            await self.send({"type": "partial", "text": text})
+        except Exception:
+            # The socket may already be gone; partial results are best effort
+            pass
+
+    def _send_partial(self, text: str):
+        _run_in_background(self._send_partial_async(text))
+
+    async def run(self):
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                self._on_audio(message["bytes"])
+                continue
+            try:
+                event = json.loads(message.get("text") or "")
+            except ValueError:
+                await self.send({"type": "error", "detail": "Expected a JSON message"})
+                continue
+            if not isinstance(event, dict):
+                await self.send({"type": "error", "detail": "Expected a JSON object"})
+                continue
+            try:
+                await self._on_event(event)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                # One failed turn (e.g. a MongoDB write) must not end the interview
+                logger.exception(f"Interview event {event.get('type')!r} failed for {self.user_id}")
+                # The in-memory window may no longer match what was stored; reload it next turn
+                self.window = None
+                await self.send({"type": "error", "detail": f"Failed to handle {event.get('type')!r}: {str(e)}"})
+
+    def _on_audio(self, chunk: bytes):
+        if self.recognizer is None:
+            # Audio outside answer_start/answer_end has nowhere to go
+            return
+        if self.recognizer.bytes_received + len(chunk) > TRANSCRIBE_MAX_BYTES:
+            recognizer, self.recognizer = self.recognizer, None
+            _run_in_background(recognizer.abort())
+            _run_in_background(self.send({"type": "error", "detail": f"Answer exceeds the {TRANSCRIBE_MAX_BYTES} byte limit"}))
+            return
+        self.recognizer.write(chunk)
+
+    async def _on_event(self, event: dict):
+        kind = event.get("type")
+        if kind == "start":
+            await self._next_question(None)
+        elif kind == "answer_start":
+            if self.recognizer is not None:
+                await self.recognizer.abort()
+            try:
+                self.recognizer = StreamingRecognizer(event.get("format"), on_partial=self._send_partial)
+            except Exception as e:
+                await self.send({"type": "error", "detail": f"Could not start speech recognition: {str(e)}"})
+        elif kind == "answer_end":
+            await self._end_answer()
+        elif kind == "answer":
+            text = (event.get("text") or "").strip()
+            if not text:
+                await self.send({"type": "error", "detail": "Answer text is empty"})
+                return
+            await self._next_question(text)
+        else:
+            await self.send({"type": "error", "detail": f"Unknown message type: {kind}"})
+
+    async def _end_answer(self):
+        if self.recognizer is None:
+            await self.send({"type": "error", "detail": "No answer in progress"})
+            return
+        recognizer, self.recognizer = self.recognizer, None
+        try:
+            text = await recognizer.finish()
+        except SpeechRecognitionError as e:
+            await self.send({"type": "error", "detail": str(e)})
+            return
+        await self.send({"type": "transcript", "text": text})
+        if not text:
+            await self.send({"type": "error", "detail": "No speech could be recognized."})
+            return
+        await self._next_question(text)
+
+    async def _load_window(self) -> Optional[dict]:
+        if self.window is None:
+            self.window = await get_interview(self.user_id, conversation_window_projection())
+        return self.window
+
+    def _record(self, entries: list):
+        """Mirrors an append to the interview in the in-memory window"""
+        self.window["conversation"] = (self.window.get("conversation", []) + entries)[-CONTEXT_WINDOW_MESSAGES:]
+        self.window["message_count"] = self.window.get("message_count", 0) + len(entries)
+
+    async def _next_question(self, user_input: Optional[str]):
+        candidate_profile, job_profile = await get_interview_profiles(self.session)
+        if not all([candidate_profile, job_profile]):
+            await self.send({"type": "error", "detail": "Missing required session data (job details, company info, or resume)"})
+            return
+
+        if user_input is None:
+            context = await load_interview_context(self.session)
+            window = None
+        else:
+            context = None
+            window = await self._load_window()
+            if window is None:
+                await self.send({"type": "error", "detail": "No interview in progress, start one first"})
+                return
+
+        prompt, messages, new_entries = build_question_messages(candidate_profile, job_profile, window, user_input)
+        await self.session.commit()
+
+        tokens = []
+        try:
+            async for token in route_llm_stream("question", prompt=prompt, messages=messages):
+                tokens.append(token)
+                await self.send({"type": "token", "token": token})
+        except Exception as e:
+            # Keep the answer so a retry (the same "answer" message) only regenerates the question
+            if new_entries and window is not None and await append_conversation(self.user_id, new_entries):
+                self._record(new_entries)
+            if isinstance(e, GroqRateLimitError):
+                await self.send({
+                    "type": "error",
+                    "detail": "Question generation is temporarily rate limited, please retry shortly",
+                    "retry_after": math.ceil(e.retry_after or 1)
+                })
+            else:
+                await self.send({"type": "error", "detail": f"Failed to generate question: {str(e)}"})
+            return
+
+        question = "".join(tokens)
+        pending = {"context": context, "new_entries": new_entries}
+        await store_question(self.user_id, pending, question)
+        entries = new_entries + [{"role": "assistant", "content": question}]
+        if context is not None:
+            self.window = {"conversation": [], "message_count": 0, "summary_upto": 0}
+        self._record(entries)
+        await self.send({"type": "question", "question": question, "interview_id": self.user_id})
+
+        _run_in_background(self._after_turn(bool(new_entries)))
+
+    async def _after_turn(self, answered: bool):
+        await update_conversation_summary(self.user_id)
+        try:
+            # Pick up the summary the background step may have advanced
+            state = await get_interview(self.user_id, {"_id": 0, "conversation_summary": 1, "summary_upto": 1})
+            if state and self.window is not None:
+                self.window.update(state)
+        except Exception as e:
+            logger.warning(f"Refreshing the conversation summary failed for {self.user_id}: {e}")
+        if answered:
+            await score_pending_turns_in_background(self.user_id)
+
+    async def close(self):
+        if self.recognizer is not None:
+            await self.recognizer.abort()
+            self.recognizer = None
+        await self.session.commit()
+
+
+@interview_ws_router.websocket("/ws")
+async def interview_socket(websocket: WebSocket, session: Optional[str] = None):
+    # Browsers cannot set headers on WebSocket requests, so the id may come as ?session=
+    user_id = session or websocket.headers.get("X-User-ID")
+    if not user_id or not verify_session_id(user_id):
+        await websocket.close(code=1008, reason="Invalid session id, request a new one from POST /session")
+        return
+
+    await websocket.accept()
+    connection = InterviewConnection(websocket, user_id)
+    try:
+        await connection.run()
+    except WebSocketDisconnect:
+        logger.debug("Interview socket closed for %s", user_id)
+    finally:
+        try:
+            await connection.close()
+        except Exception as e:
+            logger.warning(f"Closing interview socket for {user_id} failed: {e}")
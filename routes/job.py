@@ -1,26 +1,29 @@
-from fastapi import APIRouter, Request, Depends, Form, HTTPException
+from fastapi import APIRouter, Request, Depends, Form, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse
-from db.mongo_client import update_user_session
-from dependencies import get_user_session_data
+from db.session_store import UserSession
+from dependencies import session_fields
+from services.profile import profile_key, refresh_profile
 
 job_router = APIRouter(prefix="/job")
 
 @job_router.post("/update_details")
 async def update_job_details(
     request: Request,
+    background_tasks: BackgroundTasks,
     job_description: str = Form(...),
     company_details: str = Form(...),
-    user_session: dict = Depends(get_user_session_data)
+    user_session: UserSession = Depends(session_fields())
 ):
     try:
-        user_id = request.state.user_id
-        update_user_session(
-            user_id,
-            {
-                "job_description": job_description,
-                "company_details": company_details
-            }
-        )
+        profile = profile_key(job_description, company_details)
+        user_session.update({
+            "job_description": job_description,
+            "company_details": company_details,
+            "job_profile_key": profile
+        })
+        await user_session.commit()
+        # Condense the posting once, off the request path, for every later question
+        background_tasks.add_task(refresh_profile, user_session.user_id, "job", profile, job_description, company_details)
 
         # Get preview
         job_preview = ' '.join(job_description.split()[:10])
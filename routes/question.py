@@ -1,12 +1,25 @@
 from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import BackgroundTasks
+from starlette.background import BackgroundTasks as ResponseBackgroundTasks
 from typing import Optional, List
 from pydantic import BaseModel
-from services.groq_api import get_llm_response
-from db.mongo_client import update_user_session, mongo_client
-from dependencies import get_user_session_data
+from services.groq_api import GroqRateLimitError
+from services.model_router import route_llm_response, route_llm_stream
+from db.mongo_client import get_interview, start_interview, append_conversation
+from db.session_store import UserSession
+from dependencies import session_fields
+from services.context_builder import (
+    build_messages,
+    conversation_window_projection,
+    unsummarized_messages,
+    update_conversation_summary
+)
+from services.evaluation import score_pending_turns_in_background
+from services.profile import get_interview_profiles
 from fastapi import APIRouter, Request, Depends, HTTPException
-from datetime import datetime
+import json
+import math
 
 # Initialize router
 question_router = APIRouter(prefix="/question")
@@ -15,10 +28,12 @@ PROMPT_TEMPLATE = """
 You are an AI interviewer conducting a natural, friendly, and progressive job interview.
 
 Your task is to generate ONE concise interview question (1–2 sentences max) using:
-- Job Description: {job_desc}
-- Company Info: {company_info}
-- Resume: {resume_text}
-- Conversation History: {conversation_history}
+- Role and Company Profile:
+{job_profile}
+- Candidate Profile:
+{candidate_profile}
+
+A summary of earlier conversation may follow, then the most recent turns as chat messages.
 
 GOAL:
 Simulate a real interview — start warm and easy, then gradually go deeper into relevant experience and skills.
@@ -47,77 +62,130 @@ RULES:
    - Keep it concise (1–2 sentences max).
 """
 
+async def load_interview_context(user_session: UserSession) -> dict:
+    """Full resume and job text stored on the interview when it starts, for evaluation"""
+    await user_session.load(["job_description", "company_details", "cleaned_resume_text"])
+    return {
+        "job_description": user_session.get("job_description"),
+        "company_details": user_session.get("company_details"),
+        "resume_text": user_session.get("cleaned_resume_text")
+    }
+
+
+def build_question_messages(candidate_profile: str, job_profile: str, window: Optional[dict], user_input: Optional[str]):
+    """
+    Builds the prompt for the next question from the profiles and a windowed interview read
+    Returns (prompt, messages, new_entries) where new_entries is the answer still to be stored
+    """
+    conversation_summary = None
+    prev_messages = []
+    new_entries = []
+    if user_input is not None:
+        conversation_summary = window.get("conversation_summary")
+        prev_messages = unsummarized_messages(window)
+        user_message = {"role": "user", "content": user_input}
+        # /transcribe/ may already have recorded this answer
+        new_entries = [] if prev_messages and prev_messages[-1] == user_message else [user_message]
+        prev_messages = prev_messages + new_entries
+
+    # Instructions depend only on the profiles, so they are identical on every turn;
+    # the summary of older turns and the recent turns follow, within the token budget
+    instructions = PROMPT_TEMPLATE.format(
+        job_profile=job_profile,
+        candidate_profile=candidate_profile
+    )
+    messages = build_messages(instructions, prev_messages, summary=conversation_summary)
+    prompt = None if prev_messages else "Please begin the interview."
+    return prompt, messages, new_entries
+
+
+async def _prepare_question(user_id: str, user_session: UserSession, user_input: Optional[str]):
+    """Validate session data, load the conversation so far and build the prompt"""
+    # Compact profiles stand in for the raw resume and job text on every turn
+    candidate_profile, job_profile = await get_interview_profiles(user_session)
+
+    if not all([candidate_profile, job_profile]):
+        raise HTTPException(
+            status_code=400,
+            detail="Missing required session data (job details, company info, or resume)"
+        )
+
+    # If user_input is None, it's a new interview: the static context is written
+    # once together with the first question. Otherwise the turn is appended.
+    if user_input is None:
+        window = None
+        context = await load_interview_context(user_session)
+    else:
+        window = await get_interview(user_id, conversation_window_projection())
+        if window is None:
+            raise HTTPException(status_code=400, detail="No interview in progress, start one first")
+        context = None
+
+    prompt, messages, new_entries = build_question_messages(candidate_profile, job_profile, window, user_input)
+    pending = {"context": context, "new_entries": new_entries}
+    return prompt, messages, pending
+
+
+def _schedule_turn_tasks(background_tasks, user_id: str, pending: dict):
+    """Per-turn follow-up work that runs after the response has been sent"""
+    background_tasks.add_task(update_conversation_summary, user_id)
+    if pending["new_entries"]:
+        # A new answer was recorded here rather than by /transcribe/
+        background_tasks.add_task(score_pending_turns_in_background, user_id)
+
+
+async def store_question(user_id: str, pending: dict, question: str):
+    """Persist the turn with a single constant-size write to the interview"""
+    entries = pending["new_entries"] + [{"role": "assistant", "content": question}]
+
+    # Use user_id as the interview identifier
+    if pending["context"] is not None:
+        await start_interview(user_id, pending["context"], entries)
+    else:
+        await append_conversation(user_id, entries)
+
+
+def _sse_event(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+# Only the fields needed to build the prompt are read from the session
+question_session = session_fields("candidate_profile_key", "candidate_profile", "job_profile_key", "job_profile")
+
+
 @question_router.post("/generate")
 async def generate_question(
     request: Request,
+    background_tasks: BackgroundTasks,
     user_input: str = None,
-    user_session: dict = Depends(get_user_session_data)
+    user_session: UserSession = Depends(question_session)
 ):
     try:
         user_id = request.state.user_id
-        # Get session data from MongoDB
-        job_desc = user_session.get("job_description")
-        company_info = user_session.get("company_details")
-        resume_text = user_session.get("cleaned_resume_text")
-
-        if not all([job_desc, company_info, resume_text]):
-            raise HTTPException(
-                status_code=400,
-                detail="Missing required session data (job details, company info, or resume)"
-            )
+        prompt, prev_messages, pending = await _prepare_question(user_id, user_session, user_input)
 
-        # If user_input is None, it's a new interview, clear messages
-        if user_input is None:
-            update_user_session(user_id, {"messages": []})
-            prev_messages = []
-        else:
-            prev_messages = user_session.get("messages", [])
-            prev_messages.append({"role": "user", "content": user_input})
-            update_user_session(user_id, {"messages": prev_messages})
-        
-        # Create prompt including conversation history
-        conversation_history = "\n".join([f'{msg["role"]}: {msg["content"]}' for msg in prev_messages])
-        prompt = PROMPT_TEMPLATE.format(
-            job_desc=job_desc,
-            company_info=company_info,
-            resume_text=resume_text,
-            conversation_history=conversation_history
-        )
-        
         try:
-            question = get_llm_response(
+            question = await route_llm_response(
+                "question",
                 prompt=prompt,
-                messages=prev_messages,
-                model="llama-3.3-70b-versatile"
+                messages=prev_messages
+            )
+        except GroqRateLimitError as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Question generation is temporarily rate limited, please retry shortly",
+                headers={"Retry-After": str(math.ceil(e.retry_after or 1))}
             )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to generate question: {str(e)}"
             )
-        
+
         # Store response in MongoDB
-        prev_messages.append({"role": "assistant", "content": question})
-        
-        # Use user_id as the interview identifier
-        interview_data = {
-            "user_id": user_id,
-            "job_description": job_desc,
-            "company_details": company_info,
-            "resume_text": resume_text,
-            "conversation": prev_messages,
-            "start_time": datetime.utcnow()
-        }
-        
-        # Upsert the interview document using user_id as the unique key
-        mongo_client.db["interviews"].update_one(
-            {"user_id": user_id},
-            {"$set": interview_data},
-            upsert=True
-        )
-        
-        # Update user session with current messages (interview_id is now implicitly user_id)
-        update_user_session(user_id, {"messages": prev_messages})
+        await store_question(user_id, pending, question)
+        _schedule_turn_tasks(background_tasks, user_id, pending)
 
         return JSONResponse(
             status_code=200,
@@ -126,9 +194,66 @@ async def generate_question(
                 "interview_id": user_id
             }
         )
-        
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating question: {str(e)}"
+        )
+
+
+@question_router.post("/generate/stream")
+async def generate_question_stream(
+    request: Request,
+    user_input: str = None,
+    user_session: UserSession = Depends(question_session)
+):
+    """
+    Streaming variant of /generate
+    Sends `token` events as the LLM produces them, then a final `done` event
+    with the complete question once it has been stored
+    """
+    user_id = request.state.user_id
+    try:
+        prompt, prev_messages, pending = await _prepare_question(user_id, user_session, user_input)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error generating question: {str(e)}"
         )
+
+    async def event_stream():
+        tokens = []
+        try:
+            async for token in route_llm_stream(
+                "question",
+                prompt=prompt,
+                messages=prev_messages
+            ):
+                tokens.append(token)
+                yield _sse_event({"token": token}, event="token")
+
+            question = "".join(tokens)
+            await store_question(user_id, pending, question)
+            yield _sse_event({"question": question, "interview_id": user_id}, event="done")
+        except GroqRateLimitError as e:
+            yield _sse_event({
+                "detail": "Question generation is temporarily rate limited, please retry shortly",
+                "retry_after": math.ceil(e.retry_after or 1)
+            }, event="error")
+        except Exception as e:
+            yield _sse_event({"detail": f"Failed to generate question: {str(e)}"}, event="error")
+
+    background_tasks = ResponseBackgroundTasks()
+    _schedule_turn_tasks(background_tasks, user_id, pending)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background_tasks
+    )
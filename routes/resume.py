@@ -1,68 +1,64 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, UploadFile
-from db.mongo_client import update_user_session
-from dependencies import get_user_session_data
+from fastapi import APIRouter, Request, Depends, HTTPException, UploadFile, BackgroundTasks
+from db.session_store import UserSession
+from dependencies import session_fields
 import datetime
-import fitz  # PyMuPDF
-import tempfile
-import os
-import re
 
-from db.mongo_client import get_collection
+from db.mongo_client import find_resume_by_hash, save_resume
+from services.admission import decode_slot, read_upload
+from services.pdf_parser import RESUME_MAX_BYTES, content_hash, parse_resume
+from services.profile import profile_key, refresh_profile
 
 router = APIRouter()
 
-def clean_resume_text(raw_text: str) -> str:
-    """Clean up resume text by removing excess blank lines and whitespace"""
-    text = re.sub(r"\n\s*\n+", "\n\n", raw_text)  # Multiple newlines → 2 max
-    lines = [line.strip() for line in text.splitlines()]
-    non_empty_lines = [line for line in lines if line]
-    return "\n".join(non_empty_lines)
-
 @router.post("/upload", tags=["Resume"])
-async def upload_resume(request: Request, file: UploadFile, user_session: dict = Depends(get_user_session_data)):
+async def upload_resume(request: Request, file: UploadFile, background_tasks: BackgroundTasks, user_session: UserSession = Depends(session_fields())):
     try:
-        # Save PDF temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            contents = await file.read()
-            temp_file.write(contents)
-            temp_file.flush()
-            temp_path = temp_file.name
-
-        # Extract raw text
-        text_pages = []
-        with fitz.open(temp_path) as doc:
-            for page in doc:
-                text_pages.append(page.get_text())
-
-        full_text = "\n\n".join(text_pages)
-        os.remove(temp_path)
+        contents = await read_upload(file, RESUME_MAX_BYTES)
 
-        # Store raw text in MongoDB
-        resume_doc = {
-            "filename": file.filename,
-            "text_content": full_text,  # Raw form saved
-            "page_count": len(text_pages),
-            "upload_time": datetime.datetime.utcnow()
-        }
+        # The same PDF uploaded again reuses the already parsed and cleaned text
+        resume_hash = content_hash(contents)
+        resume_doc = await find_resume_by_hash(resume_hash, {"cleaned_text": 1, "page_count": 1})
+        cached = resume_doc is not None
+        if cached:
+            resume_id = resume_doc["_id"]
+        else:
+            async with decode_slot("/upload"):
+                parsed = await parse_resume(contents)
 
-        collection = get_collection("resumes")
-        result = collection.insert_one(resume_doc)
+            # Store raw text in MongoDB
+            resume_doc = {
+                "filename": file.filename,
+                "text_content": parsed["text_content"],  # Raw form saved
+                "cleaned_text": parsed["cleaned_text"],
+                "page_count": parsed["page_count"],
+                "parsed_pages": parsed["parsed_pages"],
+                "upload_time": datetime.datetime.utcnow()
+            }
+            resume_id = await save_resume(resume_hash, resume_doc)
 
-        # Clean text for session use
-        cleaned_text = clean_resume_text(full_text)
-        user_id = request.state.user_id
-        update_user_session(user_id, {"cleaned_resume_text": cleaned_text}) # Store full cleaned text
+        cleaned_text = resume_doc["cleaned_text"]
+        profile = profile_key(cleaned_text)
+        user_session.update({
+            "cleaned_resume_text": cleaned_text, # Store full cleaned text
+            "candidate_profile_key": profile
+        })
+        await user_session.commit()
+        # Condense the resume once, off the request path, for every later question
+        background_tasks.add_task(refresh_profile, user_session.user_id, "candidate", profile, cleaned_text)
 
         return {
             "success": True,
             "message": "Resume uploaded and processed successfully.",
             "parsed_data": {
-                "id": str(result.inserted_id),
+                "id": str(resume_id),
                 "filename": file.filename,
-                "page_count": len(text_pages),
+                "page_count": resume_doc["page_count"],
+                "cached": cached,
                 "snippet": cleaned_text[:500] + "..." if len(cleaned_text) > 500 else cleaned_text
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Resume processing failed: {e}")
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from services.session_ids import issue_session_id
+
+session_router = APIRouter(prefix="/session")
+
+@session_router.post("")
+async def create_session(request: Request):
+    """
+    Issues a signed session id for a new interview
+    Send it back as X-User-ID on every later request; nothing is stored until the
+    session is first written (resume upload, job details, ...)
+    """
+    user_id = issue_session_id()
+    request.state.issued_user_id = user_id
+    return JSONResponse(status_code=201, content={"user_id": user_id})
@@ -1,56 +1,35 @@
-from fastapi import APIRouter, Request, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Request, Depends, HTTPException, UploadFile, File, BackgroundTasks
 from fastapi.responses import JSONResponse
-import os
-import requests
-import tempfile
-import azure.cognitiveservices.speech as speechsdk
-from db.mongo_client import update_user_session
-from dependencies import get_user_session_data
-from pydub import AudioSegment
+from db.mongo_client import append_conversation
+from dependencies import get_user_id
+from services.evaluation import score_pending_turns_in_background
+from services.admission import decode_slot, read_upload
+from services.speech import TRANSCRIBE_MAX_BYTES, AudioTooLongError, SpeechRecognitionError, SpeechTimeoutError, transcribe_audio as recognize_speech
 
 transcription_router = APIRouter(prefix="/transcribe")
 
 @transcription_router.post("/")
-async def transcribe_audio(request: Request, file: UploadFile = File(...), user_session: dict = Depends(get_user_session_data)):
+async def transcribe_audio(request: Request, background_tasks: BackgroundTasks, file: UploadFile = File(...), user_id: str = Depends(get_user_id)):
     try:
-        # Save file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_file:
-            temp_path = temp_file.name
-            temp_file.write(await file.read())
-            
-        # Convert to wav (PCM)
-        audio = AudioSegment.from_file(temp_path, format="webm")
-        wav_path = temp_path.replace(".webm", ".wav")
-        audio.export(wav_path, format="wav")
-                    
-        # Set up the speech config and audio config
-        speech_config = speechsdk.SpeechConfig(subscription=os.getenv("AZURE_SPEECH_KEY"), region="centralindia")
-        audio_config = speechsdk.audio.AudioConfig(filename=wav_path)
-        speech_config.speech_recognition_language = "en-IN"
-        
-        # Create the recognizer
-        speech_recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
-        result = speech_recognizer.recognize_once()
+        # Audio stays in memory and is recognized in the speech worker pool
+        audio = await read_upload(file, TRANSCRIBE_MAX_BYTES)
+        try:
+            async with decode_slot("/transcribe/"):
+                text = await recognize_speech(audio)
+        except AudioTooLongError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except SpeechTimeoutError as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except SpeechRecognitionError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        # Clean up recognizer and audio config before deleting the file
-        del speech_recognizer
-        del audio_config
-
-        os.remove(temp_path)
-        
-        if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-            text = result.text
-        elif result.reason == speechsdk.ResultReason.NoMatch:
+        if not text:
             raise HTTPException(status_code=400, detail="No speech could be recognized.")
-        elif result.reason == speechsdk.ResultReason.Canceled:
-            cancellation = result.cancellation_details
-            raise HTTPException(status_code=400, detail=f"Speech Recognition canceled: {cancellation.reason}")
-        
-        # Store the result in MongoDB messages
-        user_id = request.state.user_id
-        prev_messages = user_session.get("messages", [])
-        prev_messages.append({"role": "user", "content": text})
-        update_user_session(user_id, {"messages": prev_messages})
+
+        # Append the answer to the interview conversation
+        if await append_conversation(user_id, [{"role": "user", "content": text}]):
+            # Score the answer now so /evaluate only has to aggregate
+            background_tasks.add_task(score_pending_turns_in_background, user_id)
 
         return JSONResponse(
             status_code=200,
@@ -60,9 +39,9 @@ async def transcribe_audio(request: Request, file: UploadFile = File(...), user_
             }
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.remove(temp_path)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing audio: {str(e)}"
@@ -0,0 +1,228 @@
+import os
+import math
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from services.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS
+from services.pdf_parser import PDF_PARSE_WORKERS, RESUME_MAX_BYTES
+from services.speech import SPEECH_WORKERS, TRANSCRIBE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Decode slots: held only while a resume is parsed or an answer is recognized
+ADMISSION_UPLOAD_CONCURRENCY = int(os.getenv("ADMISSION_UPLOAD_CONCURRENCY", str(PDF_PARSE_WORKERS * 2)))
+ADMISSION_UPLOAD_QUEUE = int(os.getenv("ADMISSION_UPLOAD_QUEUE", "8"))
+ADMISSION_TRANSCRIBE_CONCURRENCY = int(os.getenv("ADMISSION_TRANSCRIBE_CONCURRENCY", str(SPEECH_WORKERS)))
+ADMISSION_TRANSCRIBE_QUEUE = int(os.getenv("ADMISSION_TRANSCRIBE_QUEUE", "16"))
+# Receive slots: held for the whole request, body upload included. Larger than the decode
+# limits so slow uploads do not starve decoding; bounds memory at this many capped bodies
+ADMISSION_UPLOAD_RECEIVE_CONCURRENCY = int(os.getenv("ADMISSION_UPLOAD_RECEIVE_CONCURRENCY", "32"))
+ADMISSION_TRANSCRIBE_RECEIVE_CONCURRENCY = int(os.getenv("ADMISSION_TRANSCRIBE_RECEIVE_CONCURRENCY", "32"))
+# How long a queued request waits for a slot before it is turned away with a 503
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+# An admitted request whose body has not fully arrived within this long gets a 408
+ADMISSION_BODY_TIMEOUT = float(os.getenv("ADMISSION_BODY_TIMEOUT", "30"))
+# Room for multipart boundaries and form fields on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Caps concurrent requests on a route, with a bounded queue of waiters
+    A full queue is rejected at once (429); a queued request that does not get a
+    slot within the queue timeout is rejected too (503); both carry a Retry-After
+    estimated from recent service times
+    """
+
+    def __init__(self, route: str, max_concurrent: int, max_queue: int, max_bytes: int = None, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.route = route
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_bytes = max_bytes
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        # Moving average of how long an admitted request holds its slot
+        self._service_time = 1.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._service_time * (self.waiting + 1) / self.max_concurrent))
+
+    def _reject(self, status_code: int, reason: str, detail: str):
+        ADMISSION_REJECTIONS.labels(self.route, reason).inc()
+        raise AdmissionRejected(status_code, detail, self.retry_after())
+
+    @asynccontextmanager
+    async def admit(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self._reject(429, "queue_full", "Server is busy, please retry shortly")
+
+        self.waiting += 1
+        ADMISSION_QUEUE_DEPTH.labels(self.route).inc()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject(503, "queue_timeout", "Server is busy, please retry shortly")
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.labels(self.route).dec()
+
+        self.in_flight += 1
+        ADMISSION_IN_FLIGHT.labels(self.route).inc()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.monotonic() - start)
+            self.in_flight -= 1
+            ADMISSION_IN_FLIGHT.labels(self.route).dec()
+            self._semaphore.release()
+
+
+async def read_upload(file, max_bytes: int, chunk_size: int = 64 * 1024) -> bytes:
+    """Reads an UploadFile in chunks, failing with 413 as soon as it passes max_bytes"""
+    chunks, size = [], 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds the {max_bytes} byte limit")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def default_limits() -> Dict[str, AdmissionLimiter]:
+    """Receive limits applied by AdmissionMiddleware"""
+    return {
+        "/upload": AdmissionLimiter(
+            "/upload", ADMISSION_UPLOAD_RECEIVE_CONCURRENCY, ADMISSION_UPLOAD_QUEUE, RESUME_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+        ),
+        "/transcribe/": AdmissionLimiter(
+            "/transcribe/", ADMISSION_TRANSCRIBE_RECEIVE_CONCURRENCY, ADMISSION_TRANSCRIBE_QUEUE, TRANSCRIBE_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+        ),
+    }
+
+
+DECODE_LIMITS = {
+    "/upload": AdmissionLimiter("/upload:decode", ADMISSION_UPLOAD_CONCURRENCY, ADMISSION_UPLOAD_QUEUE),
+    "/transcribe/": AdmissionLimiter("/transcribe/:decode", ADMISSION_TRANSCRIBE_CONCURRENCY, ADMISSION_TRANSCRIBE_QUEUE),
+}
+
+
+@asynccontextmanager
+async def decode_slot(route: str):
+    """
+    Holds one of the route's decode slots around the CPU-heavy step, once the body is in memory
+    Rejections surface as an HTTPException carrying Retry-After
+    """
+    limiter = DECODE_LIMITS[route]
+    try:
+        async with limiter.admit():
+            yield
+    except AdmissionRejected as e:
+        logger.info(f"Rejected {route} decode with {e.status_code}: {limiter.in_flight} in flight, {limiter.waiting} queued")
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission control to the upload routes' request bodies
+    Runs before the multipart body is parsed, so a rejected request never has its
+    body read, and an admitted one is cut off with a 413 as soon as it exceeds the
+    cap or a 408 if it is still arriving after ADMISSION_BODY_TIMEOUT. The routes
+    take a decode slot (decode_slot) only once the body is in memory
+    """
+
+    def __init__(self, app, limits: Dict[str, AdmissionLimiter] = None, body_timeout: float = ADMISSION_BODY_TIMEOUT):
+        self.app = app
+        self.limits = limits if limits is not None else default_limits()
+        self.body_timeout = body_timeout
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limiter.max_bytes:
+            ADMISSION_REJECTIONS.labels(limiter.route, "too_large").inc()
+            await self._respond(scope, receive, send, 413, f"Request body exceeds the {limiter.max_bytes} byte limit")
+            return
+
+        received = 0
+        body_complete = False
+        deadline = None
+        started = False
+        # Status of the response sent once the body cap or deadline tripped
+        rejected = None
+
+        async def reject(status_code: int, reason: str, detail: str):
+            nonlocal rejected
+            ADMISSION_REJECTIONS.labels(limiter.route, reason).inc()
+            rejected = status_code
+            if not started:
+                await self._respond(scope, receive, send, status_code, detail)
+            # Answered here rather than raised: the app would turn an exception from
+            # receive() into a body parsing error. It sees the client leave instead
+            return {"type": "http.disconnect"}
+
+        async def limited_receive():
+            nonlocal received, body_complete
+            if rejected is not None:
+                return {"type": "http.disconnect"}
+            if body_complete:
+                # Later receives only wait for a disconnect
+                return await receive()
+            try:
+                message = await asyncio.wait_for(receive(), max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                return await reject(408, "body_timeout", "Request body was not received in time")
+            if message["type"] == "http.request":
+                body_complete = not message.get("more_body", False)
+                received += len(message.get("body", b""))
+                if received > limiter.max_bytes:
+                    return await reject(413, "too_large", f"Request body exceeds the {limiter.max_bytes} byte limit")
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            if rejected is not None:
+                # Already answered; drop the app's response to the disconnect
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            async with limiter.admit():
+                deadline = time.monotonic() + self.body_timeout
+                await self.app(scope, limited_receive, tracking_send)
+        except AdmissionRejected as e:
+            logger.info(f"Rejected {scope['path']} with {e.status_code}: {limiter.in_flight} in flight, {limiter.waiting} queued")
+            await self._respond(scope, receive, send, e.status_code, e.detail, {"Retry-After": str(e.retry_after)})
+        except Exception:
+            # Failing on the disconnect handed over after a rejection is expected
+            if rejected is None:
+                raise
+
+    async def _respond(self, scope, receive, send, status_code: int, detail: str, headers: dict = None):
+        response = JSONResponse(status_code=status_code, content={"detail": detail}, headers=headers)
+        await response(scope, receive, send)
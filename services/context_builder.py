@@ -0,0 +1,127 @@
+import os
+import logging
+from typing import List, Dict, Optional
+from services.groq_api import PRIORITY_BACKGROUND, llm_priority
+from services.model_router import route_llm_response
+from db.mongo_client import get_interview, update_interview
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on prompt tokens sent per question, including the instructions
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+# Number of most recent messages kept verbatim; older ones are folded into the summary
+CONTEXT_RECENT_MESSAGES = int(os.getenv("CONTEXT_RECENT_MESSAGES", "6"))
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "300"))
+
+# How many trailing messages a question request reads from the interview.
+# Anything older is covered by the summary unless summarization is lagging.
+CONTEXT_WINDOW_MESSAGES = CONTEXT_RECENT_MESSAGES * 2 + 2
+
+SUMMARY_PROMPT = """
+You maintain a running summary of a job interview for the interviewer.
+
+Existing summary:
+{summary}
+
+New conversation turns:
+{turns}
+
+Update the summary so it covers both. Keep the candidate's key claims, experiences, skills and
+any weak or unanswered points, and the topics already covered by the interviewer.
+Write at most {max_words} words of plain prose and return only the summary.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def _format_turns(messages: List[Dict[str, str]]) -> str:
+    return "\n".join(f'{msg["role"]}: {msg["content"]}' for msg in messages)
+
+
+def conversation_window_projection() -> dict:
+    """Projection that reads only what build_messages needs from an interview"""
+    return {
+        "_id": 0,
+        "conversation": {"$slice": -CONTEXT_WINDOW_MESSAGES},
+        "message_count": 1,
+        "conversation_summary": 1,
+        "summary_upto": 1
+    }
+
+
+def unsummarized_messages(interview: dict) -> List[Dict[str, str]]:
+    """Messages from a windowed interview read that are not yet in the summary"""
+    window = interview.get("conversation", [])
+    message_count = interview.get("message_count", len(window))
+    summary_upto = interview.get("summary_upto", 0)
+    first_index = message_count - len(window)
+    return window[max(summary_upto - first_index, 0):]
+
+
+def build_messages(instructions: str, recent: List[Dict[str, str]], summary: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Fits the instructions, the summary of older turns and as many of the most recent
+    messages as the budget allows
+    The instructions go first and unchanged so the prompt prefix stays byte-stable
+    across turns; the summary, which changes every few turns, follows in its own message
+    Returns the chat messages to send, oldest first
+    """
+    header = [{"role": "system", "content": instructions}]
+    if summary:
+        header.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    budget = CONTEXT_TOKEN_BUDGET - sum(estimate_tokens(message["content"]) + 4 for message in header)
+    kept = []
+    for message in reversed(recent):
+        cost = estimate_tokens(message["content"]) + 4
+        # Always keep the latest message so the model has something to respond to
+        if kept and cost > budget:
+            break
+        kept.append(message)
+        budget -= cost
+    if len(kept) < len(recent):
+        logger.info(f"Context budget dropped {len(recent) - len(kept)} older messages")
+    return header + list(reversed(kept))
+
+
+async def update_conversation_summary(user_id: str):
+    """
+    Folds messages that have fallen out of the recent window into the stored summary
+    Runs once per turn after the question is stored; safe to call concurrently
+    """
+    try:
+        state = await get_interview(user_id, {"_id": 0, "message_count": 1, "summary_upto": 1, "conversation_summary": 1})
+        if not state:
+            return
+        summary_upto = state.get("summary_upto", 0)
+        target = state.get("message_count", 0) - CONTEXT_RECENT_MESSAGES
+        if target <= summary_upto:
+            return
+
+        interview = await get_interview(
+            user_id,
+            # A $slice-only projection returns every other field; the inclusion limits it to the slice
+            {"_id": 0, "message_count": 1, "conversation": {"$slice": [summary_upto, target - summary_upto]}}
+        )
+        turns = interview.get("conversation", []) if interview else []
+        if not turns:
+            return
+
+        prompt = SUMMARY_PROMPT.format(
+            summary=state.get("conversation_summary") or "(none yet)",
+            turns=_format_turns(turns),
+            max_words=int(SUMMARY_MAX_TOKENS * 0.75)
+        )
+        with llm_priority(PRIORITY_BACKGROUND):
+            summary = await route_llm_response("summary", prompt=prompt, max_tokens=SUMMARY_MAX_TOKENS)
+
+        # Only apply if no other summarizer advanced the summary meanwhile
+        await update_interview(
+            user_id,
+            {"$set": {"conversation_summary": summary.strip(), "summary_upto": summary_upto + len(turns)}},
+            condition={"summary_upto": state.get("summary_upto")}
+        )
+    except Exception as e:
+        logger.warning(f"Conversation summary update failed for {user_id}: {e}")
@@ -0,0 +1,253 @@
+import os
+import json
+import asyncio
+import logging
+import statistics
+import weakref
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from db.mongo_client import get_interview, update_interview
+from services.groq_api import PRIORITY_BACKGROUND, evaluate_answer, evaluate_all_categories, llm_priority
+from services.model_router import routed_call
+
+logger = logging.getLogger(__name__)
+
+# "concurrent" scores each category in its own call, "batched" scores all of them in one JSON call
+EVALUATION_MODE = os.getenv("EVALUATION_MODE", "concurrent").lower()
+EVALUATION_CATEGORY_TIMEOUT = float(os.getenv("EVALUATION_CATEGORY_TIMEOUT", "30"))
+EVALUATION_BATCH_TIMEOUT = float(os.getenv("EVALUATION_BATCH_TIMEOUT", "60"))
+
+CATEGORIES = {
+    "communication_clarity": "Analyze the candidate's communication and clarity. Score from 1-10. Summarize in 2 sentences: Sentence structure, clarity, filler words, fluency, answer length, coherence, logical flow.",
+    "role_specific_knowledge": "Analyze the candidate's role-specific knowledge and technical depth. Score from 1-10. Summarize in 2 sentences: How well they address technical/domain-specific questions, use of correct terminology and methods, logical explanations of concepts or processes.",
+    "problem_solving_critical_thinking": "Analyze the candidate's problem-solving and critical thinking. Score from 1-10. Summarize in 2 sentences: Whether the answer follows a logical framework (e.g., STAR, cause-effect), creativity in solutions or handling ambiguity, structured thinking.",
+    "soft_skills_behavioral_competency": "Analyze the candidate's soft skills and behavioral competency. Score from 1-10. Summarize in 2 sentences: Emotional tone (e.g., empathy, ownership, humility), teamwork, leadership, handling feedback or conflict, use of personal examples and reflection.",
+    "engagement_motivation": "Analyze the candidate's engagement and motivation. Score from 1-10. Summarize in 2 sentences: Energy and enthusiasm for the role, relevance of their questions or curiosity shown, clear understanding of the company/mission."
+}
+
+
+def parse_category_response(llm_response: str) -> Dict[str, Any]:
+    """Parse an 'Score: [score]\\nSummary: [summary]' response"""
+    score_line, summary_line = llm_response.strip().split('\n', 1)
+    score = int(score_line.split(': ')[1])
+    summary = summary_line.split(': ', 1)[1]
+    return {"score": score, "summary": summary}
+
+
+async def _evaluate_category(user_answer: str, job_description: str, question: str, category: str) -> Dict[str, Any]:
+    llm_response = await asyncio.wait_for(
+        routed_call("category_evaluation", lambda model: evaluate_answer(
+            user_answer=user_answer,
+            job_description=job_description,
+            question=question,
+            category=category,
+            analysis_criteria=CATEGORIES[category],
+            model=model,
+            validate=parse_category_response
+        )),
+        timeout=EVALUATION_CATEGORY_TIMEOUT
+    )
+    return parse_category_response(llm_response)
+
+
+async def evaluate_concurrently(user_answer: str, job_description: str, question: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Runs one evaluation per category in parallel
+    Returns (results, errors) so a failed category does not discard the others
+    """
+    categories = list(CATEGORIES)
+    outcomes = await asyncio.gather(
+        *(_evaluate_category(user_answer, job_description, question, category) for category in categories),
+        return_exceptions=True
+    )
+
+    results, errors = {}, {}
+    for category, outcome in zip(categories, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            errors[category] = f"timed out after {EVALUATION_CATEGORY_TIMEOUT:g}s"
+        elif isinstance(outcome, Exception):
+            errors[category] = str(outcome)
+        else:
+            results[category] = outcome
+    return results, errors
+
+
+async def evaluate_batched(user_answer: str, job_description: str, question: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Scores all categories with a single structured LLM call
+    Returns (results, errors) in the same shape as evaluate_concurrently
+    """
+    try:
+        llm_response = await asyncio.wait_for(
+            routed_call("batch_evaluation", lambda model: evaluate_all_categories(
+                user_answer=user_answer,
+                job_description=job_description,
+                question=question,
+                categories=CATEGORIES,
+                model=model,
+                validate=_validate_batch_response
+            )),
+            timeout=EVALUATION_BATCH_TIMEOUT
+        )
+        return parse_batch_response(llm_response)
+    except asyncio.TimeoutError:
+        message = f"timed out after {EVALUATION_BATCH_TIMEOUT:g}s"
+        return {}, {category: message for category in CATEGORIES}
+    except Exception as e:
+        return {}, {category: str(e) for category in CATEGORIES}
+
+
+def parse_batch_response(llm_response: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Parse the JSON object from evaluate_all_categories into (results, errors)"""
+    parsed = json.loads(llm_response)
+    results, errors = {}, {}
+    for category in CATEGORIES:
+        try:
+            entry = parsed[category]
+            results[category] = {"score": int(entry["score"]), "summary": str(entry["summary"])}
+        except Exception as e:
+            errors[category] = f"missing or malformed result: {e!r}"
+    return results, errors
+
+
+def _validate_batch_response(llm_response: str):
+    _, errors = parse_batch_response(llm_response)
+    if errors:
+        raise ValueError(f"Malformed categories: {', '.join(errors)}")
+
+
+async def evaluate_categories(user_answer: str, job_description: str, question: str, mode: str = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    mode = (mode or EVALUATION_MODE).lower()
+    if mode == "batched":
+        return await evaluate_batched(user_answer, job_description, question)
+    if mode != "concurrent":
+        logger.warning(f"Unknown EVALUATION_MODE '{mode}', falling back to concurrent")
+    return await evaluate_concurrently(user_answer, job_description, question)
+
+
+# --- Incremental per-turn scoring ---
+
+# One scoring pass per interview at a time; a lock lives only while someone holds or waits on it
+_scoring_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def answer_turns(conversation: List[Dict[str, str]]) -> List[Tuple[int, str, str]]:
+    """Returns (conversation index, question, answer) for every candidate answer"""
+    turns = []
+    question = ""
+    for index, entry in enumerate(conversation):
+        if entry["role"] == "assistant":
+            question = entry["content"]
+        elif entry["role"] == "user":
+            turns.append((index, question, entry["content"]))
+    return turns
+
+
+async def _score_turn(job_description: str, question: str, answer: str, previous: dict = None) -> dict:
+    results, errors = await evaluate_categories(user_answer=answer, job_description=job_description, question=question)
+    # Keep categories that succeeded on an earlier attempt
+    results = {**(previous or {}).get("scores", {}), **results}
+    errors = {category: error for category, error in errors.items() if category not in results}
+    return {"scores": results, "errors": errors, "scored_at": datetime.utcnow()}
+
+
+async def score_pending_turns(user_id: str) -> Optional[dict]:
+    """
+    Scores every answer that has no complete score yet and stores the results
+    on the interview under turn_scores.<conversation index>
+    Returns the interview's conversation and turn scores, or None if there is no interview
+    """
+    lock = _scoring_locks.get(user_id)
+    if lock is None:
+        lock = _scoring_locks[user_id] = asyncio.Lock()
+
+    async with lock:
+        interview = await get_interview(
+            user_id,
+            {"_id": 0, "conversation": 1, "job_description": 1, "turn_scores": 1, "start_time": 1}
+        )
+        if interview is None:
+            return None
+
+        turn_scores = interview.get("turn_scores", {})
+        pending = [
+            (index, question, answer)
+            for index, question, answer in answer_turns(interview.get("conversation", []))
+            if str(index) not in turn_scores or turn_scores[str(index)].get("errors")
+        ]
+        if pending:
+            scored = await asyncio.gather(*(
+                _score_turn(interview.get("job_description", ""), question, answer, turn_scores.get(str(index)))
+                for index, question, answer in pending
+            ))
+            updates = {str(index): result for (index, _, _), result in zip(pending, scored)}
+            # Skip the write if the interview was restarted while scoring
+            await update_interview(
+                user_id,
+                {"$set": {f"turn_scores.{index}": result for index, result in updates.items()}},
+                condition={"start_time": interview.get("start_time")}
+            )
+            turn_scores = {**turn_scores, **updates}
+
+        interview["turn_scores"] = turn_scores
+        return interview
+
+
+async def score_pending_turns_in_background(user_id: str):
+    try:
+        # Yield to live interviews: background scoring only uses spare LLM capacity
+        with llm_priority(PRIORITY_BACKGROUND):
+            await score_pending_turns(user_id)
+    except Exception as e:
+        logger.warning(f"Background answer scoring failed for {user_id}: {e}")
+
+
+def aggregate_turn_scores(turn_scores: Dict[str, dict]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Combines per-turn scores into one result per category
+    The score is the mean across answers; the summary is taken from the answer
+    whose score is closest to that mean (latest wins ties)
+    """
+    ordered = [turn_scores[key] for key in sorted(turn_scores, key=int)]
+    results, errors = {}, {}
+    for category in CATEGORIES:
+        scored = [turn["scores"][category] for turn in ordered if category in turn.get("scores", {})]
+        if not scored:
+            last_error = next((turn["errors"][category] for turn in reversed(ordered) if category in turn.get("errors", {})), "not scored")
+            errors[category] = last_error
+            continue
+        mean = statistics.fmean(entry["score"] for entry in scored)
+        representative = min(reversed(scored), key=lambda entry: abs(entry["score"] - mean))
+        results[category] = {"score": round(mean), "summary": representative["summary"]}
+    return results, errors
+
+
+class EvaluationError(Exception):
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def evaluate_interview(user_id: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Scores any unscored answers, aggregates all turns and stores the analysis
+    Returns (results, errors); raises EvaluationError when nothing can be evaluated
+    """
+    interview_data = await score_pending_turns(user_id)
+    if not interview_data:
+        raise EvaluationError("Interview not found", status_code=404)
+
+    turn_scores = interview_data.get("turn_scores", {})
+    if not turn_scores:
+        raise EvaluationError("No conversation data found for evaluation", status_code=400)
+
+    analysis_results, errors = aggregate_turn_scores(turn_scores)
+    if not analysis_results:
+        raise EvaluationError(f"LLM evaluation failed: {errors}")
+
+    # Update MongoDB with the (possibly partial) analysis results
+    await update_interview(
+        user_id,
+        {"$set": {"analysis": analysis_results, "analysis_errors": errors}, "$unset": {"in_progress": ""}}
+    )
+    return analysis_results, errors
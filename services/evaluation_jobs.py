@@ -0,0 +1,190 @@
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, List
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from db.mongo_client import get_collection
+from services.evaluation import EvaluationError, evaluate_interview
+from services.groq_api import PRIORITY_EVALUATION, llm_priority
+
+logger = logging.getLogger(__name__)
+
+EVALUATION_WORKERS = int(os.getenv("EVALUATION_WORKERS", "2"))
+EVALUATION_JOB_LEASE_SECONDS = float(os.getenv("EVALUATION_JOB_LEASE_SECONDS", "120"))
+EVALUATION_JOB_POLL_SECONDS = float(os.getenv("EVALUATION_JOB_POLL_SECONDS", "2"))
+EVALUATION_JOB_MAX_ATTEMPTS = int(os.getenv("EVALUATION_JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs are removed by a TTL index on finished_at
+EVALUATION_JOB_RETENTION_SECONDS = int(os.getenv("EVALUATION_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+JOBS_COLLECTION = "evaluation_jobs"
+# Fields callers of enqueue_evaluation/get_job read; leaves out worker bookkeeping
+JOB_PROJECTION = {"user_id": 1, "status": 1, "result": 1, "error": 1, "created_at": 1, "updated_at": 1}
+
+
+def _jobs():
+    return get_collection(JOBS_COLLECTION)
+
+
+async def ensure_job_indexes():
+    try:
+        # At most one queued/running job per interview; `active` is unset once a job finishes
+        await _jobs().create_index(
+            "user_id", unique=True, partialFilterExpression={"active": True}, name="one_active_job_per_user"
+        )
+        await _jobs().create_index([("active", 1), ("status", 1), ("created_at", 1)], name="claim_order")
+        await _jobs().create_index(
+            "finished_at", expireAfterSeconds=EVALUATION_JOB_RETENTION_SECONDS, name="finished_jobs_ttl"
+        )
+    except Exception as e:
+        logger.warning(f"Could not create evaluation job indexes: {e}")
+
+
+async def enqueue_evaluation(user_id: str) -> dict:
+    """Queues an evaluation for the interview, or returns the one already queued or running"""
+    existing = await _jobs().find_one({"user_id": user_id, "active": True}, JOB_PROJECTION)
+    if existing is not None:
+        return existing
+
+    now = datetime.utcnow()
+    job = {
+        "_id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "status": "queued",
+        "active": True,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now
+    }
+    try:
+        await _jobs().insert_one(job)
+    except DuplicateKeyError:
+        # Lost the race against a concurrent request for the same interview
+        return await _jobs().find_one({"user_id": user_id, "active": True}, JOB_PROJECTION) or job
+
+    worker_pool.notify()
+    return job
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    return await _jobs().find_one({"_id": job_id}, JOB_PROJECTION)
+
+
+async def _claim_job(worker_id: str) -> Optional[dict]:
+    """Takes the oldest queued job, or a running job whose worker stopped renewing its lease"""
+    now = datetime.utcnow()
+    return await _jobs().find_one_and_update(
+        {
+            "active": True,
+            "$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_until": {"$lt": now}}
+            ]
+        },
+        {
+            "$set": {
+                "status": "running",
+                "worker_id": worker_id,
+                "lease_until": now + timedelta(seconds=EVALUATION_JOB_LEASE_SECONDS),
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _renew_lease(job_id: str, worker_id: str):
+    while True:
+        await asyncio.sleep(EVALUATION_JOB_LEASE_SECONDS / 3)
+        await _jobs().update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=EVALUATION_JOB_LEASE_SECONDS)}}
+        )
+
+
+async def _finish_job(job: dict, worker_id: str, update: dict):
+    now = datetime.utcnow()
+    await _jobs().update_one(
+        {"_id": job["_id"], "worker_id": worker_id},
+        {"$set": {**update, "updated_at": now, "finished_at": now}, "$unset": {"active": "", "lease_until": ""}}
+    )
+
+
+async def _run_job(job: dict, worker_id: str):
+    lease = asyncio.create_task(_renew_lease(job["_id"], worker_id))
+    try:
+        with llm_priority(PRIORITY_EVALUATION):
+            results, errors = await evaluate_interview(job["user_id"])
+        await _finish_job(job, worker_id, {"status": "done", "result": {**results, "errors": errors}})
+    except EvaluationError as e:
+        await _finish_job(job, worker_id, {"status": "failed", "error": str(e), "error_status": e.status_code})
+    except Exception as e:
+        logger.exception(f"Evaluation job {job['_id']} failed")
+        if job.get("attempts", 1) < EVALUATION_JOB_MAX_ATTEMPTS:
+            await _jobs().update_one(
+                {"_id": job["_id"], "worker_id": worker_id},
+                {"$set": {"status": "queued", "last_error": str(e), "updated_at": datetime.utcnow()}, "$unset": {"lease_until": ""}}
+            )
+        else:
+            await _finish_job(job, worker_id, {"status": "failed", "error": str(e), "error_status": 500})
+    finally:
+        lease.cancel()
+
+
+class EvaluationWorkerPool:
+    """
+    Fixed number of asyncio workers pulling jobs from MongoDB
+    Job state lives in the collection, so any process can pick up work left
+    behind by one that restarted once its lease expires
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        prefix = uuid.uuid4().hex[:8]
+        self._tasks = [asyncio.create_task(self._work(f"{prefix}-{index}")) for index in range(self.size)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self, worker_id: str):
+        while True:
+            try:
+                job = await _claim_job(worker_id)
+            except Exception as e:
+                logger.warning(f"Evaluation worker {worker_id} could not claim a job: {e}")
+                job = None
+
+            if job is not None:
+                try:
+                    await _run_job(job, worker_id)
+                except Exception:
+                    # Recording the outcome failed; the lease expires and another worker retries the job
+                    logger.exception(f"Evaluation worker {worker_id} could not finish job {job['_id']}")
+                continue
+
+            # Idle: wait for a local enqueue or poll for jobs queued by other processes
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), EVALUATION_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+worker_pool = EvaluationWorkerPool(EVALUATION_WORKERS)
@@ -1,47 +1,499 @@
 import os
-import requests
-from typing import Dict, Any
+import json
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import httpx
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, AsyncIterator, Callable
 from dotenv import load_dotenv
+from services.metrics import observe_llm_call
+from services import llm_cache, model_stats
 load_dotenv(override=True)
 
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "60"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "32"))
+# Groq rate limits enforced client-side, applied to each model separately as Groq does.
+# They are per process: with N workers or replicas set them to the account limit / N.
+# 0 (the default) disables a limit; the free tier is 30 RPM and 12000 TPM for most models
+GROQ_RPM_LIMIT = int(os.getenv("GROQ_RPM_LIMIT", "0"))
+GROQ_TPM_LIMIT = int(os.getenv("GROQ_TPM_LIMIT", "0"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+GROQ_RETRY_BASE_DELAY = float(os.getenv("GROQ_RETRY_BASE_DELAY", "0.5"))
+GROQ_RETRY_MAX_DELAY = float(os.getenv("GROQ_RETRY_MAX_DELAY", "20"))
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+DEFAULT_COMPLETION_TOKENS = 256
 
-def get_llm_response(prompt: str, messages: list[dict] = None, model: str = "llama-3.3-70b-versatile") -> str:
+# Lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_EVALUATION = 1
+PRIORITY_BACKGROUND = 2
+_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+# Set by callers that need to know when their request leaves the scheduler queue
+_admitted: ContextVar[Optional[asyncio.Event]] = ContextVar("llm_admitted", default=None)
+
+
+class GroqAPIError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class GroqRateLimitError(GroqAPIError):
+    """Raised when Groq keeps rate limiting after all retries"""
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Runs the LLM calls made inside the block (and tasks it spawns) at the given priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def notify_admission(event: asyncio.Event):
+    """Sets `event` once an LLM call made inside the block is admitted by the scheduler"""
+    token = _admitted.set(event)
+    try:
+        yield
+    finally:
+        _admitted.reset(token)
+
+
+class TokenBucket:
+    """Continuously refilling per-minute budget; a capacity of 0 means unlimited"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        if self.capacity > 0:
+            self.tokens -= min(amount, self.capacity)
+
+
+class ModelLimits:
+    """One model's RPM/TPM buckets and 429 cooldown"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.cooldown_until = 0.0
+
+    def wait_time(self, estimated_tokens: int, now: float) -> float:
+        return max(
+            self.cooldown_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(estimated_tokens, now)
+        )
+
+
+class LLMScheduler:
     """
-    Calls Groq API with given prompt and messages
-    Returns generated text from API
+    Admits Groq requests in priority order within each model's RPM/TPM limits
+    and a shared concurrency cap. A 429 pauses admissions for that model until
+    Retry-After passes; requests for other models keep flowing.
     """
-    headers = {
-        "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}",
-        "Content-Type": "application/json"
-    }
-    
+
+    def __init__(self, rpm: int, tpm: int, max_concurrency: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self._limits: Dict[str, ModelLimits] = {}
+        self._active = 0
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def limits(self, model: str) -> ModelLimits:
+        if model not in self._limits:
+            self._limits[model] = ModelLimits(self.rpm, self.tpm)
+        return self._limits[model]
+
+    def _next_for(self, model: str) -> tuple:
+        return min(waiter for waiter in self._waiters if waiter[2] == model)
+
+    async def acquire(self, model: str, priority: int, estimated_tokens: int):
+        condition = self._get_condition()
+        limits = self.limits(model)
+        entry = (priority, next(self._sequence), model)
+        async with condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    delay = None
+                    # Priority order holds per model, so a throttled model does not hold up the others
+                    if self._next_for(model) == entry and self._active < self.max_concurrency:
+                        delay = limits.wait_time(estimated_tokens, time.monotonic())
+                        if delay <= 0:
+                            self._waiters.remove(entry)
+                            heapq.heapify(self._waiters)
+                            limits.requests.consume(1)
+                            limits.tokens.consume(estimated_tokens)
+                            self._active += 1
+                            condition.notify_all()
+                            admitted = _admitted.get()
+                            if admitted is not None:
+                                admitted.set()
+                            return
+                    try:
+                        await asyncio.wait_for(condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    condition.notify_all()
+                raise
+
+    async def release(self):
+        condition = self._get_condition()
+        async with condition:
+            self._active -= 1
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: int, estimated_tokens: int):
+        await self.acquire(model, priority, estimated_tokens)
+        try:
+            yield
+        finally:
+            await self.release()
+
+    def record_usage(self, model: str, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Corrects the model's TPM bucket once the real token count is known"""
+        if actual_tokens is not None:
+            self.limits(model).tokens.consume(actual_tokens - estimated_tokens)
+
+    def pause(self, model: str, seconds: float):
+        limits = self.limits(model)
+        limits.cooldown_until = max(limits.cooldown_until, time.monotonic() + seconds)
+
+
+scheduler = LLMScheduler(GROQ_RPM_LIMIT, GROQ_TPM_LIMIT, GROQ_MAX_CONCURRENCY)
+
+
+def _estimate_tokens(payload: dict) -> int:
+    prompt_chars = sum(len(message.get("content") or "") for message in payload["messages"])
+    return prompt_chars // 4 + payload.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_delay(error: GroqAPIError, attempt: int) -> float:
+    if error.retry_after is not None:
+        # _should_retry already refused waits beyond GROQ_RETRY_MAX_DELAY
+        return error.retry_after + random.uniform(0, 0.25)
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(GROQ_RETRY_MAX_DELAY, GROQ_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _should_retry(error: GroqAPIError, attempt: int) -> bool:
+    if error.retry_after is not None and error.retry_after > GROQ_RETRY_MAX_DELAY:
+        # Retrying early would only be rejected again; the caller gets the real Retry-After
+        return False
+    return error.status_code in RETRYABLE_STATUS_CODES and attempt < GROQ_MAX_RETRIES
+
+
+def _hold_model(error: GroqAPIError, model: str):
+    """Holds back every queued request for the model until Groq's Retry-After has passed"""
+    if error.status_code == 429 and error.retry_after is not None:
+        scheduler.pause(model, error.retry_after)
+
+
+def _final_error(error: GroqAPIError) -> GroqAPIError:
+    if error.status_code == 429:
+        return GroqRateLimitError(str(error), status_code=429, retry_after=error.retry_after)
+    return error
+
+
+async def _backoff(error: GroqAPIError, attempt: int, model: str):
+    delay = _retry_delay(error, attempt)
+    if error.status_code == 429:
+        # Hold back every queued request for the model, not just this one
+        scheduler.pause(model, delay)
+    await asyncio.sleep(delay)
+
+
+# Shared client, created on first use so every request reuses the same
+# pooled HTTP/2 connections to Groq
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(GROQ_READ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_CONNECTIONS,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _build_payload(prompt: Optional[str], messages: Optional[list[dict]], model: str, **params) -> Dict[str, Any]:
     payload = {
         "model": model,
-        "messages": [{"role": "system", "content": "You are a helpful assistant."}] + (messages or [])
+        "messages": [{"role": "system", "content": "You are a helpful assistant."}] + (messages or []),
+        **params
     }
     if prompt:
         payload["messages"].append({"role": "user", "content": prompt})
-    
+    return payload
+
+
+def _auth_headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {os.getenv('GROQ_API_KEY')}",
+        "Content-Type": "application/json"
+    }
+
+
+def _is_valid(content: str, validate: Optional[Callable[[str], Any]]) -> bool:
+    if validate is None:
+        return True
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        
+        validate(content)
+        return True
+    except Exception:
+        return False
+
+
+async def get_llm_response(
+    prompt: str,
+    messages: list[dict] = None,
+    model: str = "llama-3.3-70b-versatile",
+    cache: bool = True,
+    validate: Callable[[str], Any] = None,
+    **params
+) -> str:
+    """
+    Calls Groq API with given prompt and messages
+    Identical requests are answered from the response cache unless cache=False
+    When `validate` is given (e.g. the caller's parser), only responses it accepts
+    are cached or served from the cache, so a malformed reply is not replayed on retry
+    Returns generated text from API
+    """
+    payload = _build_payload(prompt, messages, model, **params)
+    use_cache = cache and llm_cache.LLM_CACHE_ENABLED
+    if use_cache:
+        key = llm_cache.cache_key(payload)
+        cached = await llm_cache.get_cached_response(key)
+        if cached is not None and _is_valid(cached, validate):
+            return cached
+
+    content = await _post_completion(payload, model)
+    if use_cache and _is_valid(content, validate):
+        await llm_cache.store_response(key, model, content)
+    return content
+
+async def _post_completion(payload: dict, model: str) -> str:
+    """Sends a completion through the scheduler, retrying 429s and transient 5xx errors"""
+    priority = _priority.get()
+    estimated_tokens = _estimate_tokens(payload)
+    attempt = 0
+    while True:
+        try:
+            async with scheduler.slot(model, priority, estimated_tokens):
+                content, usage = await _post_once(payload, model)
+            scheduler.record_usage(model, estimated_tokens, (usage or {}).get("total_tokens"))
+            return content
+        except GroqAPIError as e:
+            if not _should_retry(e, attempt):
+                _hold_model(e, model)
+                raise _final_error(e)
+            await _backoff(e, attempt, model)
+            attempt += 1
+
+async def _post_once(payload: dict, model: str):
+    start = time.perf_counter()
+    status, usage = "error", None
+
+    try:
+        response = await get_http_client().post(GROQ_API_URL, headers=_auth_headers(), json=payload)
+
         if response.status_code != 200:
-            raise Exception(f"Groq API error: {response.text}")
-        
-        return response.json()["choices"][0]["message"]["content"]
+            status = f"http_{response.status_code}"
+            raise GroqAPIError(
+                f"Groq API error: {response.text}",
+                status_code=response.status_code,
+                retry_after=_parse_retry_after(response.headers.get("retry-after"))
+            )
+
+        body = response.json()
+        usage = body.get("usage")
+        content = body["choices"][0]["message"]["content"]
+        status = "ok"
+        return content, usage
+    except GroqAPIError:
+        raise
+    except asyncio.CancelledError:
+        # A hedge loser, a timed-out caller or a client disconnect, not a model failure
+        status = "cancelled"
+        raise
+    except httpx.TimeoutException as e:
+        status = "timeout"
+        raise GroqAPIError(f"Error calling Groq API: request timed out ({e.__class__.__name__})")
     except Exception as e:
-        raise Exception(f"Error calling Groq API: {str(e)}")
+        raise GroqAPIError(f"Error calling Groq API: {str(e)}")
+    finally:
+        elapsed = time.perf_counter() - start
+        observe_llm_call(model, status, False, elapsed, usage)
+        if status != "cancelled":
+            model_stats.record(model, elapsed, status == "ok")
+
+async def stream_llm_response(prompt: str, messages: list[dict] = None, model: str = "llama-3.3-70b-versatile", cache: bool = True, **params) -> AsyncIterator[str]:
+    """
+    Calls Groq API in streaming mode
+    A cached response is replayed as a single delta unless cache=False
+    Yields content deltas as they arrive
+    """
+    payload = _build_payload(prompt, messages, model, stream=True, **params)
+    use_cache = cache and llm_cache.LLM_CACHE_ENABLED
+    if use_cache:
+        key = llm_cache.cache_key(payload)
+        cached = await llm_cache.get_cached_response(key)
+        if cached is not None:
+            yield cached
+            return
+
+    deltas = []
+    async for delta in _stream_completion(payload, model):
+        deltas.append(delta)
+        yield delta
+    if use_cache:
+        await llm_cache.store_response(key, model, "".join(deltas))
 
-def evaluate_answer(
+async def _stream_completion(payload: dict, model: str) -> AsyncIterator[str]:
+    """Streams a completion through the scheduler; retries only before the first token"""
+    priority = _priority.get()
+    estimated_tokens = _estimate_tokens(payload)
+    attempt = 0
+    while True:
+        started = False
+        usage_holder = {}
+        try:
+            async with scheduler.slot(model, priority, estimated_tokens):
+                async for delta in _stream_once(payload, model, usage_holder):
+                    started = True
+                    yield delta
+            scheduler.record_usage(model, estimated_tokens, (usage_holder.get("usage") or {}).get("total_tokens"))
+            return
+        except GroqAPIError as e:
+            if started or not _should_retry(e, attempt):
+                _hold_model(e, model)
+                raise _final_error(e)
+            await _backoff(e, attempt, model)
+            attempt += 1
+
+async def _stream_once(payload: dict, model: str, usage_holder: dict) -> AsyncIterator[str]:
+    start = time.perf_counter()
+    status, usage = "error", None
+    first_token_at = None
+
+    try:
+        async with get_http_client().stream("POST", GROQ_API_URL, headers=_auth_headers(), json=payload) as response:
+            if response.status_code != 200:
+                status = f"http_{response.status_code}"
+                body = await response.aread()
+                raise GroqAPIError(
+                    f"Groq API error: {body.decode(errors='replace')}",
+                    status_code=response.status_code,
+                    retry_after=_parse_retry_after(response.headers.get("retry-after"))
+                )
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                # Groq reports usage on the final chunk under x_groq
+                usage = chunk.get("x_groq", {}).get("usage") or chunk.get("usage") or usage
+                choices = chunk.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        model_stats.record(model, first_token_at - start, True, kind="first_token")
+                    yield delta
+        status = "ok"
+        usage_holder["usage"] = usage
+    except GroqAPIError:
+        raise
+    except (asyncio.CancelledError, GeneratorExit):
+        # Cancelled or closed by the consumer; not a model failure
+        status = "cancelled"
+        raise
+    except httpx.TimeoutException as e:
+        status = "timeout"
+        raise GroqAPIError(f"Error calling Groq API: request timed out ({e.__class__.__name__})")
+    except Exception as e:
+        raise GroqAPIError(f"Error calling Groq API: {str(e)}")
+    finally:
+        elapsed = time.perf_counter() - start
+        observe_llm_call(model, status, True, elapsed, usage)
+        if first_token_at is None and status not in ("ok", "cancelled"):
+            model_stats.record(model, elapsed, False, kind="first_token")
+
+async def evaluate_answer(
     user_answer: str,
     job_description: str,
     question: str,
     category: str,
-    analysis_criteria: str
+    analysis_criteria: str,
+    cache: bool = True,
+    model: str = "llama-3.3-70b-versatile",
+    validate: Callable[[str], Any] = None
 ) -> str:
     system_prompt = (
         "You are an AI interview evaluator. Your task is to assess a candidate's answer "
@@ -64,4 +516,44 @@ def evaluate_answer(
         {"role": "user", "content": user_prompt}
     ]
 
-    return get_llm_response(prompt=None, messages=messages)
\ No newline at end of file
+    return await get_llm_response(prompt=None, messages=messages, model=model, cache=cache, validate=validate)
+
+async def evaluate_all_categories(
+    user_answer: str,
+    job_description: str,
+    question: str,
+    categories: Dict[str, str],
+    cache: bool = True,
+    model: str = "llama-3.3-70b-versatile",
+    validate: Callable[[str], Any] = None
+) -> str:
+    """
+    Scores every category in a single call
+    Returns a JSON object string keyed by category name
+    """
+    system_prompt = (
+        "You are an AI interview evaluator. Your task is to assess a candidate's answer "
+        "to an interview question against several categories, each with its own criteria. "
+        "For every category provide a score from 1 to 10 and a 2-sentence summary explaining the score. "
+        "The output MUST be a JSON object whose keys are the category names and whose values are "
+        "objects of the form {\"score\": <int>, \"summary\": <string>}."
+    )
+
+    criteria = "\n".join(f"- {name}: {prompt}" for name, prompt in categories.items())
+    user_prompt = (
+        f"Candidate's Answer: {user_answer}\n\n"
+        f"Job Description: {job_description}\n\n"
+        f"Interview Question: {question}\n\n"
+        f"Evaluation Categories and Criteria:\n{criteria}\n\n"
+        "Please respond with the JSON object only."
+    )
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+    return await get_llm_response(
+        prompt=None, messages=messages, model=model, cache=cache, validate=validate,
+        response_format={"type": "json_object"}
+    )
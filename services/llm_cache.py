@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from db.mongo_client import get_collection
+from services.metrics import LLM_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+# Lifetime of shared entries in Mongo, enforced by a TTL index on created_at
+LLM_CACHE_MONGO_TTL = int(os.getenv("LLM_CACHE_MONGO_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_COLLECTION = "llm_cache"
+
+
+class TTLCache:
+    """Bounded in-process LRU whose entries expire after a fixed TTL"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+memory_cache = TTLCache(LLM_CACHE_SIZE, LLM_CACHE_TTL)
+
+
+def cache_key(payload: dict) -> str:
+    """Hash of model + messages + sampling parameters; streaming does not change the answer"""
+    keyed = {key: value for key, value in payload.items() if key != "stream"}
+    return hashlib.sha256(json.dumps(keyed, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+async def get_cached_response(key: str) -> Optional[str]:
+    value = memory_cache.get(key)
+    if value is not None:
+        LLM_CACHE_REQUESTS.labels("memory_hit").inc()
+        return value
+
+    try:
+        document = await get_collection(LLM_CACHE_COLLECTION).find_one({"_id": key}, {"response": 1})
+    except Exception as e:
+        logger.warning(f"LLM cache lookup failed: {e}")
+        document = None
+
+    if document is not None:
+        LLM_CACHE_REQUESTS.labels("mongo_hit").inc()
+        memory_cache.set(key, document["response"])
+        return document["response"]
+
+    LLM_CACHE_REQUESTS.labels("miss").inc()
+    return None
+
+
+async def store_response(key: str, model: str, response: str):
+    memory_cache.set(key, response)
+    try:
+        await get_collection(LLM_CACHE_COLLECTION).update_one(
+            {"_id": key},
+            {"$set": {"response": response, "model": model, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"LLM cache store failed: {e}")
+
+
+async def ensure_cache_indexes():
+    try:
+        await get_collection(LLM_CACHE_COLLECTION).create_index(
+            "created_at", expireAfterSeconds=LLM_CACHE_MONGO_TTL, name="llm_cache_ttl"
+        )
+    except Exception as e:
+        logger.warning(f"Could not create LLM cache TTL index: {e}")
@@ -0,0 +1,165 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from pymongo import monitoring
+
+# Buckets cover everything from cached Mongo reads to multi-second LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum"
+)
+DEPENDENCY_LATENCY = Histogram(
+    "dependency_duration_seconds",
+    "Latency of calls to external dependencies and CPU-heavy stages",
+    ["dependency", "operation", "status"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Groq chat completion latency (time to last token for streams)",
+    ["model", "status", "stream"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported by Groq",
+    ["model", "kind"]
+)
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total",
+    "LLM response cache lookups by outcome",
+    ["result"]
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests admitted and being handled by admission-controlled routes",
+    ["route"],
+    multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for a slot on admission-controlled routes",
+    ["route"],
+    multiprocess_mode="livesum"
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests turned away by admission control",
+    ["route", "reason"]
+)
+PDF_PAGES = Histogram(
+    "pdf_pages",
+    "Pages per parsed resume",
+    buckets=(1, 2, 3, 5, 10, 20, 50)
+)
+
+
+def observe_llm_call(model: str, status: str, stream: bool, duration: float, usage: dict = None):
+    LLM_LATENCY.labels(model, status, "true" if stream else "false").observe(duration)
+    if usage:
+        LLM_TOKENS.labels(model, "prompt").inc(usage.get("prompt_tokens", 0))
+        LLM_TOKENS.labels(model, "completion").inc(usage.get("completion_tokens", 0))
+
+
+@contextmanager
+def track(dependency: str, operation: str):
+    """Times a block and records it as a dependency span with ok/error status"""
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        DEPENDENCY_LATENCY.labels(dependency, operation, status).observe(time.perf_counter() - start)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records every MongoDB command as a dependency span, via pymongo command monitoring"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        DEPENDENCY_LATENCY.labels("mongodb", event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        DEPENDENCY_LATENCY.labels("mongodb", event.command_name, "error").observe(event.duration_micros / 1e6)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording request latency and in-flight requests
+    The timer stops on the last body chunk rather than when the headers go out,
+    so streamed responses (SSE, NDJSON) are measured end to end
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        status = 500
+        finished = False
+
+        def observe():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            REQUESTS_IN_FLIGHT.dec()
+            # Label by path template rather than raw path to keep metric cardinality bounded
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status)
+            ).observe(time.perf_counter() - start)
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                observe()
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            observe()
+
+
+def render_metrics():
+    """Returns (body, content_type) for the /metrics endpoint"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate across worker processes when running under a multi-process server
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,223 @@
+import os
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from services import model_stats
+from services.groq_api import get_llm_response, notify_admission, stream_llm_response
+
+logger = logging.getLogger(__name__)
+
+LARGE_MODEL = "llama-3.3-70b-versatile"
+INSTANT_MODEL = "llama-3.1-8b-instant"
+
+# Task -> (primary, fallback). Override with MODEL_<TASK>="primary[,fallback]"
+DEFAULT_ROUTES = {
+    "question": (LARGE_MODEL, INSTANT_MODEL),
+    # One category of one answer: short, rubric-driven output the instant model handles well
+    "category_evaluation": (INSTANT_MODEL, LARGE_MODEL),
+    "batch_evaluation": (LARGE_MODEL, INSTANT_MODEL),
+    "summary": (os.getenv("SUMMARY_MODEL", INSTANT_MODEL), None),
+    "profile": (INSTANT_MODEL, LARGE_MODEL),
+}
+
+# Tasks whose callers wait on the response; others only fail over on errors
+MODEL_HEDGED_TASKS = {task.strip() for task in os.getenv("MODEL_HEDGED_TASKS", "question").split(",") if task.strip()}
+MODEL_HEDGE_ENABLED = os.getenv("MODEL_HEDGE_ENABLED", "true").lower() == "true"
+MODEL_HEDGE_PERCENTILE = float(os.getenv("MODEL_HEDGE_PERCENTILE", "95"))
+# Used until the primary has enough samples for a percentile
+MODEL_HEDGE_DEFAULT_DELAY = float(os.getenv("MODEL_HEDGE_DEFAULT_DELAY", "3"))
+MODEL_HEDGE_MIN_DELAY = float(os.getenv("MODEL_HEDGE_MIN_DELAY", "0.5"))
+MODEL_HEDGE_MAX_DELAY = float(os.getenv("MODEL_HEDGE_MAX_DELAY", "10"))
+MODEL_STATS_MIN_SAMPLES = int(os.getenv("MODEL_STATS_MIN_SAMPLES", "20"))
+# Above this recent error rate the fallback is tried first
+MODEL_ERROR_RATE_THRESHOLD = float(os.getenv("MODEL_ERROR_RATE_THRESHOLD", "0.5"))
+
+
+def _load_routes() -> Dict[str, Tuple[str, Optional[str]]]:
+    routes = dict(DEFAULT_ROUTES)
+    for task in routes:
+        override = os.getenv(f"MODEL_{task.upper()}")
+        if override:
+            models = [model.strip() for model in override.split(",") if model.strip()]
+            routes[task] = (models[0], models[1] if len(models) > 1 else None)
+    return routes
+
+
+ROUTES = _load_routes()
+
+
+def _unhealthy(model: str) -> bool:
+    stats = model_stats.get_stats(model)
+    return stats.count() >= MODEL_STATS_MIN_SAMPLES and stats.error_rate() > MODEL_ERROR_RATE_THRESHOLD
+
+
+def models_for(task: str) -> List[str]:
+    """Models to use for a task in order of preference; the fallback goes first while the primary is failing"""
+    primary, fallback = ROUTES[task]
+    if fallback is None:
+        return [primary]
+    if _unhealthy(primary) and not _unhealthy(fallback):
+        return [fallback, primary]
+    return [primary, fallback]
+
+
+def hedge_delay(model: str, kind: str = "complete") -> float:
+    """How long to wait on a model before hedging: its recent latency percentile, clamped"""
+    stats = model_stats.get_stats(model, kind)
+    delay = stats.percentile(MODEL_HEDGE_PERCENTILE) if stats.count() >= MODEL_STATS_MIN_SAMPLES else None
+    if delay is None:
+        delay = MODEL_HEDGE_DEFAULT_DELAY
+    return min(max(delay, MODEL_HEDGE_MIN_DELAY), MODEL_HEDGE_MAX_DELAY)
+
+
+def _should_hedge(task: str) -> bool:
+    return MODEL_HEDGE_ENABLED and task in MODEL_HEDGED_TASKS
+
+
+async def _cancel(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _admitted_call(call: Callable[[str], Awaitable[str]], model: str, admitted: asyncio.Event) -> str:
+    with notify_admission(admitted):
+        return await call(model)
+
+
+async def _within_deadline(attempt: asyncio.Task, admitted: asyncio.Event, delay: float) -> bool:
+    """
+    Waits for an attempt up to its hedge deadline, counted from when the scheduler admits it
+    Time spent queued behind RPM/TPM limits does not count: hedging then would only
+    spend more of an already exhausted budget
+    Returns whether the attempt finished in time
+    """
+    admission = asyncio.create_task(admitted.wait())
+    try:
+        await asyncio.wait({attempt, admission}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        await _cancel([admission])
+    if not attempt.done():
+        await asyncio.wait({attempt}, timeout=delay)
+    return attempt.done()
+
+
+async def routed_call(task: str, call: Callable[[str], Awaitable[str]]) -> str:
+    """
+    Runs call(model) against the task's models
+    Hedged tasks start the fallback once the primary passes its deadline and take
+    whichever finishes first; other tasks only move to the fallback on an error
+    If every model fails, the first model's error is raised
+    Calls still running when this returns or is cancelled are cancelled with it
+    """
+    models = models_for(task)
+    started = []
+    try:
+        admitted = asyncio.Event()
+        primary = asyncio.create_task(_admitted_call(call, models[0], admitted))
+        started.append(primary)
+        if len(models) == 1:
+            return await primary
+
+        if _should_hedge(task):
+            if not await _within_deadline(primary, admitted, hedge_delay(models[0])):
+                logger.info(f"Hedging {task}: {models[0]} exceeded its deadline, starting {models[1]}")
+        else:
+            await asyncio.wait({primary})
+
+        if primary.done() and primary.exception() is None:
+            return primary.result()
+
+        fallback = asyncio.create_task(call(models[1]))
+        started.append(fallback)
+        pending = {primary, fallback}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                if finished.exception() is None:
+                    return finished.result()
+        raise primary.exception()
+    finally:
+        await _cancel([attempt for attempt in started if not attempt.done()])
+
+
+async def route_llm_response(task: str, prompt: str = None, messages: List[Dict[str, str]] = None, **params) -> str:
+    """get_llm_response with the model chosen (and hedged) by the task's route"""
+    return await routed_call(
+        task,
+        lambda model: get_llm_response(prompt=prompt, messages=messages, model=model, **params)
+    )
+
+
+async def _first_chunk(stream: AsyncIterator[str], admitted: asyncio.Event = None) -> Optional[str]:
+    """First chunk of a stream, or None if it ends without output"""
+    try:
+        with notify_admission(admitted or asyncio.Event()):
+            return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def route_llm_stream(task: str, prompt: str = None, messages: List[Dict[str, str]] = None, **params) -> AsyncIterator[str]:
+    """
+    stream_llm_response with the model chosen by the task's route
+    Hedging races time to first token: once a stream has produced a token the other is dropped
+    Every started stream is cancelled and closed when this generator finishes or is closed
+    """
+    models = models_for(task)
+    streams = {}
+    attempts = {}
+    try:
+        streams = {model: stream_llm_response(prompt=prompt, messages=messages, model=model, **params) for model in models}
+        admitted = asyncio.Event()
+        primary = asyncio.create_task(_first_chunk(streams[models[0]], admitted))
+        attempts[primary] = models[0]
+
+        if len(models) > 1 and _should_hedge(task):
+            if not await _within_deadline(primary, admitted, hedge_delay(models[0], "first_token")):
+                logger.info(f"Hedging {task} stream: {models[0]} has not started, starting {models[1]}")
+                attempts[asyncio.create_task(_first_chunk(streams[models[1]]))] = models[1]
+
+        first_error = None
+        winner, first = None, None
+        pending = set(attempts)
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                if finished.exception() is None:
+                    winner, first = attempts[finished], finished.result()
+                    break
+                if attempts[finished] == models[0]:
+                    first_error = finished.exception()
+            # Fail over when every started stream has failed before its first token
+            if winner is None and not pending and len(attempts) < len(models):
+                fallback = models[len(attempts)]
+                attempt = asyncio.create_task(_first_chunk(streams[fallback]))
+                attempts[attempt] = fallback
+                pending = {attempt}
+
+        if winner is None:
+            raise first_error or next(iter(attempts)).exception()
+
+        # Drop the losing attempt before relaying the winner
+        await _cancel([attempt for attempt in attempts if not attempt.done()])
+        for model, stream in streams.items():
+            if model != winner:
+                await stream.aclose()
+
+        if first is None:
+            return
+        yield first
+        async for chunk in streams[winner]:
+            yield chunk
+    finally:
+        await _cancel([attempt for attempt in attempts if not attempt.done()])
+        for stream in streams.values():
+            await stream.aclose()
+
+
+def route_stats() -> dict:
+    return {
+        "routes": {task: {"models": models_for(task), "hedged": _should_hedge(task)} for task in ROUTES},
+        "models": model_stats.snapshot()
+    }
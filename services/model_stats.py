@@ -0,0 +1,69 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+MODEL_STATS_WINDOW = int(os.getenv("MODEL_STATS_WINDOW", "200"))
+# Samples older than this no longer count towards latency or error rate
+MODEL_STATS_MAX_AGE = float(os.getenv("MODEL_STATS_MAX_AGE", "600"))
+
+
+class ModelStats:
+    """Rolling latency and error rate for one model and measurement kind"""
+
+    def __init__(self, window: int = MODEL_STATS_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self._samples.append((time.monotonic(), latency, ok))
+
+    def _recent(self):
+        cutoff = time.monotonic() - MODEL_STATS_MAX_AGE
+        with self._lock:
+            return [sample for sample in self._samples if sample[0] >= cutoff]
+
+    def count(self) -> int:
+        return len(self._recent())
+
+    def percentile(self, pct: float) -> Optional[float]:
+        latencies = sorted(latency for _, latency, ok in self._recent() if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(pct / 100 * len(latencies)))]
+
+    def error_rate(self) -> float:
+        samples = self._recent()
+        if not samples:
+            return 0.0
+        return sum(1 for _, _, ok in samples if not ok) / len(samples)
+
+
+# Keyed by (model, kind) where kind is "complete" or "first_token"
+_stats: Dict[tuple, ModelStats] = {}
+
+
+def get_stats(model: str, kind: str = "complete") -> ModelStats:
+    key = (model, kind)
+    stats = _stats.get(key)
+    if stats is None:
+        stats = _stats.setdefault(key, ModelStats())
+    return stats
+
+
+def record(model: str, latency: float, ok: bool, kind: str = "complete"):
+    get_stats(model, kind).record(latency, ok)
+
+
+def snapshot() -> dict:
+    return {
+        f"{model}:{kind}": {
+            "samples": stats.count(),
+            "p50_s": stats.percentile(50),
+            "p95_s": stats.percentile(95),
+            "error_rate": stats.error_rate()
+        }
+        for (model, kind), stats in _stats.items()
+    }
@@ -0,0 +1,75 @@
+import os
+import re
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from services.metrics import PDF_PAGES, track
+
+RESUME_MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", str(5 * 1024 * 1024)))
+RESUME_MAX_PAGES = int(os.getenv("RESUME_MAX_PAGES", "10"))
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "2"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def clean_resume_text(raw_text: str) -> str:
+    """Clean up resume text by removing excess blank lines and whitespace"""
+    text = re.sub(r"\n\s*\n+", "\n\n", raw_text)  # Multiple newlines → 2 max
+    lines = [line.strip() for line in text.splitlines()]
+    non_empty_lines = [line for line in lines if line]
+    return "\n".join(non_empty_lines)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def extract_resume_text(data: bytes, max_pages: int) -> dict:
+    """
+    Extracts and cleans text from an in-memory PDF, reading at most max_pages pages
+    Runs inside the parser process pool
+    """
+    import fitz  # PyMuPDF, imported in the worker so the web process never loads it
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page_count = doc.page_count
+        text_pages = [doc[index].get_text() for index in range(min(page_count, max_pages))]
+
+    full_text = "\n\n".join(text_pages)
+    return {
+        "text_content": full_text,
+        "cleaned_text": clean_resume_text(full_text),
+        "page_count": page_count,
+        "parsed_pages": len(text_pages)
+    }
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=PDF_PARSE_WORKERS)
+    return _executor
+
+
+async def parse_resume(data: bytes) -> dict:
+    """Parses a PDF off the event loop in the bounded process pool"""
+    global _executor
+    loop = asyncio.get_running_loop()
+    try:
+        with track("pymupdf", "parse"):
+            parsed = await loop.run_in_executor(_get_executor(), extract_resume_text, data, RESUME_MAX_PAGES)
+        PDF_PAGES.observe(parsed["page_count"])
+        return parsed
+    except BrokenProcessPool:
+        # A worker died (e.g. on a malformed PDF); replace the pool for later requests
+        _executor = None
+        raise
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
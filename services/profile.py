@@ -0,0 +1,116 @@
+import os
+import hashlib
+import logging
+from typing import Optional, Tuple
+from db.session_store import UserSession
+from services.context_builder import estimate_tokens
+from services.model_router import route_llm_response
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on each profile; both are sent with every question instead of the raw text
+PROFILE_MAX_TOKENS = int(os.getenv("PROFILE_MAX_TOKENS", "350"))
+# Bump when the prompts change so stored profiles are rebuilt
+PROFILE_VERSION = "1"
+
+CANDIDATE_PROFILE_PROMPT = """
+Condense this resume into a compact candidate profile for an interviewer.
+
+Resume:
+{resume_text}
+
+List, as short bullet points: current and past roles with employers and years, key technical
+and domain skills, notable projects or achievements with measurable results, and education.
+Use at most {max_words} words and return only the profile.
+"""
+
+JOB_PROFILE_PROMPT = """
+Condense this job posting into a compact profile for an interviewer.
+
+Job Description:
+{job_desc}
+
+Company Info:
+{company_info}
+
+List, as short bullet points: the role and seniority, must-have requirements, nice-to-have
+skills, main responsibilities, and what the company does and values.
+Use at most {max_words} words and return only the profile.
+"""
+
+# kind -> (session fields holding the raw inputs, prompt)
+PROFILES = {
+    "candidate": (("cleaned_resume_text",), CANDIDATE_PROFILE_PROMPT),
+    "job": (("job_description", "company_details"), JOB_PROFILE_PROMPT),
+}
+
+
+def profile_key(*parts: str) -> str:
+    """Content hash of a profile's inputs; a stored profile is reused only while this matches"""
+    digest = hashlib.sha256(PROFILE_VERSION.encode())
+    for part in parts:
+        digest.update(b"\0" + part.encode())
+    return digest.hexdigest()
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    text = text.strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max_tokens * 4].rsplit(" ", 1)[0] + " ..."
+
+
+async def build_profile(kind: str, *inputs: str) -> str:
+    """Summarizes the raw inputs; falls back to truncating them if the LLM call fails"""
+    _, template = PROFILES[kind]
+    names = ("resume_text",) if kind == "candidate" else ("job_desc", "company_info")
+    prompt = template.format(**dict(zip(names, inputs)), max_words=int(PROFILE_MAX_TOKENS * 0.75))
+    try:
+        # Identical inputs (e.g. the same resume uploaded by another user) hit the LLM cache
+        profile = await route_llm_response("profile", prompt=prompt, max_tokens=PROFILE_MAX_TOKENS, temperature=0)
+    except Exception as e:
+        logger.warning(f"Building the {kind} profile failed, using truncated input: {e}")
+        profile = "\n\n".join(inputs)
+    return _truncate(profile, PROFILE_MAX_TOKENS)
+
+
+async def refresh_profile(user_id: str, kind: str, key: str, *inputs: str):
+    """Background step after /upload or /job/update_details: stores the profile for the new inputs"""
+    try:
+        profile = await build_profile(kind, *inputs)
+        session = UserSession(user_id)
+        session.update({f"{kind}_profile": {"key": key, "text": profile}})
+        await session.commit()
+    except Exception as e:
+        logger.warning(f"Storing the {kind} profile failed for {user_id}: {e}")
+
+
+async def get_profile(user_session: UserSession, kind: str) -> Optional[str]:
+    """
+    The session's profile of the given kind, built on the spot if the background
+    step has not finished or the inputs changed since it ran
+    Returns None when the raw inputs are missing from the session
+    """
+    await user_session.load([f"{kind}_profile_key", f"{kind}_profile"])
+    expected_key = user_session.get(f"{kind}_profile_key")
+    stored = user_session.get(f"{kind}_profile")
+    if stored and expected_key and stored.get("key") == expected_key:
+        return stored["text"]
+
+    fields, _ = PROFILES[kind]
+    await user_session.load(fields)
+    inputs = [user_session.get(field) for field in fields]
+    if not all(inputs):
+        return None
+    key = profile_key(*inputs)
+    if stored and stored.get("key") == key:
+        return stored["text"]
+
+    profile = await build_profile(kind, *inputs)
+    user_session.update({f"{kind}_profile_key": key, f"{kind}_profile": {"key": key, "text": profile}})
+    return profile
+
+
+async def get_interview_profiles(user_session: UserSession) -> Tuple[Optional[str], Optional[str]]:
+    """(candidate profile, job profile) for question generation"""
+    return await get_profile(user_session, "candidate"), await get_profile(user_session, "job")
@@ -0,0 +1,65 @@
+import os
+import hmac
+import uuid
+import base64
+import hashlib
+import logging
+import secrets
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Ids issued before signing was introduced are plain uuids. Anyone can mint one, so they are
+# refused unless this is turned on for a client migration
+SESSION_ACCEPT_UNSIGNED = os.getenv("SESSION_ACCEPT_UNSIGNED", "false").lower() == "true"
+# Local development only: sign with a random per-process secret when SESSION_SECRET is unset.
+# Such ids stop validating after a restart and are not shared between workers
+SESSION_ALLOW_RANDOM_SECRET = os.getenv("SESSION_ALLOW_RANDOM_SECRET", "false").lower() == "true"
+
+_secret: Optional[bytes] = None
+
+
+def _get_secret() -> bytes:
+    global _secret
+    if _secret is None:
+        configured = os.getenv("SESSION_SECRET")
+        if configured:
+            _secret = configured.encode()
+        elif SESSION_ALLOW_RANDOM_SECRET:
+            logger.warning("SESSION_SECRET is not set; using a random per-process secret")
+            _secret = secrets.token_bytes(32)
+        else:
+            raise RuntimeError("SESSION_SECRET is not set (set SESSION_ALLOW_RANDOM_SECRET=true for local development)")
+    return _secret
+
+
+def check_session_secret():
+    """Fails startup when no signing secret is available"""
+    _get_secret()
+
+
+def _signature(session_id: str) -> str:
+    digest = hmac.new(_get_secret(), session_id.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:18]).decode()
+
+
+def issue_session_id() -> str:
+    """New signed session id of the form <uuid hex>.<signature>; nothing is stored"""
+    session_id = uuid.uuid4().hex
+    return f"{session_id}.{_signature(session_id)}"
+
+
+def verify_session_id(value: str) -> bool:
+    """Checks a client-supplied session id without touching the database"""
+    session_id, _, signature = value.partition(".")
+    if not signature:
+        return SESSION_ACCEPT_UNSIGNED and _is_uuid(value)
+    return hmac.compare_digest(signature, _signature(session_id))
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
@@ -0,0 +1,292 @@
+import os
+import asyncio
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from services.metrics import track
+
+AZURE_SPEECH_REGION = os.getenv("AZURE_SPEECH_REGION", "centralindia")
+AZURE_SPEECH_LANGUAGE = os.getenv("AZURE_SPEECH_LANGUAGE", "en-IN")
+# "pcm" decodes the upload to 16 kHz mono PCM through an ffmpeg pipe first (needs ffmpeg on the host);
+# "compressed" streams it to the recognizer as-is, which needs GStreamer and its plugins
+# (gstreamer1.0-plugins-base/good/bad/ugly) installed alongside the Speech SDK
+SPEECH_INPUT_FORMAT = os.getenv("SPEECH_INPUT_FORMAT", "pcm").lower()
+SPEECH_WORKERS = int(os.getenv("SPEECH_WORKERS", "8"))
+# Time allowed for recognizing an uploaded answer on top of the audio's own length
+SPEECH_RECOGNITION_TIMEOUT = float(os.getenv("SPEECH_RECOGNITION_TIMEOUT", "30"))
+# Longest answer a live (WebSocket) recognition session will listen to
+SPEECH_STREAM_MAX_SECONDS = float(os.getenv("SPEECH_STREAM_MAX_SECONDS", "600"))
+# Caps on a single answer, uploaded or streamed
+TRANSCRIBE_MAX_BYTES = int(os.getenv("TRANSCRIBE_MAX_BYTES", str(25 * 1024 * 1024)))
+SPEECH_MAX_AUDIO_SECONDS = float(os.getenv("SPEECH_MAX_AUDIO_SECONDS", "300"))
+PCM_BYTES_PER_SECOND = 16000 * 2
+# Recognizer offsets and durations are in 100 ns ticks
+TICKS_PER_SECOND = 10_000_000
+PUSH_CHUNK_BYTES = 32 * 1024
+
+_speech_config = None
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class SpeechRecognitionError(Exception):
+    pass
+
+
+class AudioTooLongError(SpeechRecognitionError):
+    pass
+
+
+class SpeechTimeoutError(SpeechRecognitionError):
+    pass
+
+
+def _sdk():
+    """Imports the Azure Speech SDK on first use; its native libraries are slow to load"""
+    import azure.cognitiveservices.speech as speechsdk
+    return speechsdk
+
+
+def get_speech_config():
+    global _speech_config
+    if _speech_config is None:
+        speechsdk = _sdk()
+        _speech_config = speechsdk.SpeechConfig(subscription=os.getenv("AZURE_SPEECH_KEY"), region=AZURE_SPEECH_REGION)
+        _speech_config.speech_recognition_language = AZURE_SPEECH_LANGUAGE
+    return _speech_config
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=SPEECH_WORKERS, thread_name_prefix="speech")
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def decode_to_pcm(audio: bytes) -> bytes:
+    """Decodes any ffmpeg-readable audio to 16 kHz mono 16-bit PCM entirely through pipes"""
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", "16000", "pipe:1"],
+        input=audio,
+        capture_output=True,
+        check=False
+    )
+    if result.returncode != 0:
+        raise SpeechRecognitionError(f"Audio decoding failed: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def create_push_stream(input_format: str):
+    speechsdk = _sdk()
+    if input_format == "pcm":
+        stream_format = speechsdk.audio.AudioStreamFormat(samples_per_second=16000, bits_per_sample=16, channels=1)
+    else:
+        stream_format = speechsdk.audio.AudioStreamFormat(
+            compressed_stream_format=speechsdk.AudioStreamContainerFormat.ANY
+        )
+    return speechsdk.audio.PushAudioInputStream(stream_format=stream_format)
+
+
+class ContinuousRecognition:
+    """
+    Continuous recognition over a push stream, driven by the SDK's callbacks
+    Collects every recognized utterance, so answers longer than a single
+    recognize_once() utterance are transcribed in full, and stops once the
+    audio runs past max_seconds
+    on_finished is called from an SDK thread when the session ends
+    """
+
+    def __init__(self, push_stream, on_partial=None, on_segment=None, max_seconds: float = None, on_finished=None):
+        speechsdk = _sdk()
+        self.max_seconds = SPEECH_MAX_AUDIO_SECONDS if max_seconds is None else max_seconds
+        self.on_partial = on_partial
+        self.on_segment = on_segment
+        self.on_finished = on_finished
+        self.segments = []
+        self.errors = []
+        self.too_long = False
+        self.finished = threading.Event()
+
+        audio_config = speechsdk.audio.AudioConfig(stream=push_stream)
+        self.recognizer = speechsdk.SpeechRecognizer(speech_config=get_speech_config(), audio_config=audio_config)
+        self.recognizer.recognized.connect(self._recognized)
+        self.recognizer.recognizing.connect(self._recognizing)
+        self.recognizer.canceled.connect(self._canceled)
+        self.recognizer.session_stopped.connect(lambda evt: self._finish())
+
+    def _finish(self):
+        if not self.finished.is_set():
+            self.finished.set()
+            if self.on_finished:
+                self.on_finished()
+
+    def _past_limit(self, result) -> bool:
+        if self.max_seconds and (result.offset + result.duration) / TICKS_PER_SECOND > self.max_seconds:
+            self.too_long = True
+            self._finish()
+            return True
+        return False
+
+    def _recognized(self, evt):
+        if self._past_limit(evt.result):
+            return
+        if evt.result.reason == _sdk().ResultReason.RecognizedSpeech and evt.result.text:
+            self.segments.append(evt.result.text)
+            if self.on_segment:
+                self.on_segment(evt.result.text)
+
+    def _recognizing(self, evt):
+        if self._past_limit(evt.result):
+            return
+        if self.on_partial and evt.result.text:
+            self.on_partial(" ".join(self.segments + [evt.result.text]))
+
+    def _canceled(self, evt):
+        details = evt.cancellation_details
+        if details.reason == _sdk().CancellationReason.Error:
+            self.errors.append(SpeechRecognitionError(f"Speech Recognition canceled: {details.reason} {details.error_details}"))
+        self._finish()
+
+    def timed_out(self):
+        self.errors.append(SpeechTimeoutError("Speech recognition timed out"))
+
+    def result(self) -> list:
+        """
+        The recognized segments, or the error that ended the session
+        A session that failed or timed out raises even when some segments came back:
+        they are a cut-off transcript, not the answer
+        """
+        if self.too_long:
+            raise AudioTooLongError(f"Audio exceeds the {self.max_seconds:g} second limit")
+        if self.errors:
+            raise self.errors[0]
+        return self.segments
+
+
+def recognition_timeout(audio_seconds: Optional[float]) -> float:
+    """
+    How long to wait for recognition of a recording: about its length (recognition
+    runs near real time) plus SPEECH_RECOGNITION_TIMEOUT. Recordings of unknown
+    length get the longest audio accepted
+    """
+    if audio_seconds is None:
+        audio_seconds = SPEECH_MAX_AUDIO_SECONDS or SPEECH_STREAM_MAX_SECONDS
+    return audio_seconds + SPEECH_RECOGNITION_TIMEOUT
+
+
+def recognize_continuous(push_stream, timeout: float = None, on_partial=None, on_segment=None, max_seconds: float = None):
+    """
+    Runs continuous recognition over a push stream until the stream is closed
+    Blocks the calling thread; returns the list of recognized segments
+    """
+    recognition = ContinuousRecognition(push_stream, on_partial, on_segment, max_seconds)
+    recognition.recognizer.start_continuous_recognition()
+    try:
+        if not recognition.finished.wait(timeout or recognition_timeout(None)):
+            recognition.timed_out()
+    finally:
+        recognition.recognizer.stop_continuous_recognition()
+    return recognition.result()
+
+
+def transcribe_bytes(audio: bytes, input_format: str = None) -> str:
+    """Transcribes a complete in-memory recording; blocking"""
+    input_format = (input_format or SPEECH_INPUT_FORMAT).lower()
+    audio_seconds = None
+    if input_format == "pcm":
+        with track("ffmpeg", "decode"):
+            audio = decode_to_pcm(audio)
+        audio_seconds = len(audio) / PCM_BYTES_PER_SECOND
+        if SPEECH_MAX_AUDIO_SECONDS and audio_seconds > SPEECH_MAX_AUDIO_SECONDS:
+            raise AudioTooLongError(f"Audio exceeds the {SPEECH_MAX_AUDIO_SECONDS:g} second limit")
+
+    push_stream = create_push_stream(input_format)
+    for offset in range(0, len(audio), PUSH_CHUNK_BYTES):
+        push_stream.write(audio[offset:offset + PUSH_CHUNK_BYTES])
+    push_stream.close()
+
+    with track("azure_speech", "recognize"):
+        segments = recognize_continuous(push_stream, timeout=recognition_timeout(audio_seconds))
+    return " ".join(segments).strip()
+
+
+async def transcribe_audio(audio: bytes, input_format: str = None) -> str:
+    """Transcribes a recording in the bounded speech worker pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), transcribe_bytes, audio, input_format)
+
+
+class StreamingRecognizer:
+    """
+    Continuous recognition fed chunk by chunk while the candidate is still speaking
+    Recognition starts as soon as it is created, so by the time the answer ends only
+    the last utterance is left to recognize. The session is driven by SDK callbacks
+    that resolve an asyncio future; no speech worker thread is held while the
+    candidate talks, so live answers cannot starve /transcribe/
+    Audio is "compressed" (any container GStreamer reads, e.g. webm/opus) or "pcm"
+    (16 kHz mono 16-bit); there is no ffmpeg step for live audio
+    """
+
+    def __init__(self, input_format: str = None, on_partial=None):
+        input_format = (input_format or SPEECH_INPUT_FORMAT).lower()
+        loop = asyncio.get_running_loop()
+        # Recognizer callbacks fire on SDK threads; hand results back to the event loop
+        partial = (lambda text: loop.call_soon_threadsafe(on_partial, text)) if on_partial else None
+        self._finished = loop.create_future()
+        self.push_stream = create_push_stream(input_format)
+        self._recognition = ContinuousRecognition(
+            self.push_stream,
+            on_partial=partial,
+            on_finished=lambda: loop.call_soon_threadsafe(self._set_finished)
+        )
+        self.bytes_received = 0
+        self._closed = False
+        self._result = asyncio.ensure_future(self._recognize())
+
+    def _set_finished(self):
+        if not self._finished.done():
+            self._finished.set_result(None)
+
+    async def _recognize(self) -> list:
+        loop = asyncio.get_running_loop()
+        recognizer = self._recognition.recognizer
+        with track("azure_speech", "recognize_stream"):
+            # Starting and stopping are short SDK round trips; only they run off the loop
+            await loop.run_in_executor(None, lambda: recognizer.start_continuous_recognition_async().get())
+            try:
+                await asyncio.wait_for(asyncio.shield(self._finished), SPEECH_STREAM_MAX_SECONDS)
+            except asyncio.TimeoutError:
+                self._recognition.timed_out()
+            finally:
+                await loop.run_in_executor(None, lambda: recognizer.stop_continuous_recognition_async().get())
+            return self._recognition.result()
+
+    def write(self, chunk: bytes):
+        self.bytes_received += len(chunk)
+        self.push_stream.write(chunk)
+
+    def _close(self):
+        if not self._closed:
+            self._closed = True
+            self.push_stream.close()
+
+    async def finish(self) -> str:
+        """Ends the audio and returns the full transcript"""
+        self._close()
+        segments = await self._result
+        return " ".join(segments).strip()
+
+    async def abort(self):
+        self._close()
+        try:
+            await self._result
+        except Exception:
+            pass